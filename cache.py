@@ -0,0 +1,305 @@
+import hashlib
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib encoder produces the same JSON, only slower
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_ID = "text-embedding-004"
+SIMILARITY_THRESHOLD = 0.92
+# Seconds to skip the semantic tier after an embedding call fails
+EMBEDDING_RETRY_DELAY = 60
+
+def make_key(*parts: Any) -> str:
+    """Build a stable SHA-256 cache key from JSON-serialisable parts."""
+    if orjson is not None:
+        payload = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)
+    else:
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+@lru_cache(maxsize=1)
+def _embedding_model():
+    from vertexai.language_models import TextEmbeddingModel
+    return TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL_ID)
+
+@lru_cache(maxsize=1024)
+def embed_text(text: str) -> Tuple[float, ...]:
+    """
+    Embed text with Vertex AI and normalise it to unit length.
+
+    Args:
+        text: Text to embed
+
+    Returns:
+        Unit-length embedding vector
+    """
+    values = _embedding_model().get_embeddings([text])[0].values
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return tuple(v / norm for v in values)
+
+@dataclass
+class CacheEntry:
+    """A cached response together with what is needed to match it again."""
+    value: Any
+    created_at: float
+    scope: Optional[str] = None
+    embedding: Optional[Tuple[float, ...]] = None
+
+@lru_cache(maxsize=1)
+def _embedding_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-embed")
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses.
+
+    The first tier is an exact match on the cache key. On a miss, entries that
+    share the same scope (everything except the question) are compared by
+    cosine similarity of their question embeddings, so paraphrased questions
+    can reuse an earlier answer.
+
+    When db_path is given, entries are also written to a SQLite file and the
+    most recent unexpired ones are loaded back on start-up, so the cache
+    survives restarts. Values must then be JSON-serialisable.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        ttl: float = 3600,
+        similarity_threshold: float = SIMILARITY_THRESHOLD,
+        embed: Optional[Callable[[str], Tuple[float, ...]]] = embed_text,
+        db_path: Optional[str] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.embed = embed
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._embed_retry_at = 0.0
+        self._conn = None
+        if db_path:
+            try:
+                self._open_store(db_path)
+            except sqlite3.Error as e:
+                logger.warning(f"Response cache store unavailable, using memory only: {e}")
+                self._conn = None
+
+    def get(self, key: str, question: Optional[str] = None, scope: Optional[str] = None) -> Optional[Any]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Exact-match cache key
+            question: Optional question text for the semantic tier
+            scope: Key of everything besides the question; required for the semantic tier
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.created_at <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            # Embedding the question is a network call; only make it when a
+            # live entry in the same scope could match
+            comparable = bool(question and scope) and any(
+                candidate.scope == scope and candidate.embedding is not None
+                and now - candidate.created_at <= self.ttl
+                for candidate in self._entries.values()
+            )
+
+        embedding = self._embed(question) if comparable else None
+        if embedding is not None:
+            best_key, best_score = None, self.similarity_threshold
+            with self._lock:
+                for candidate_key, candidate in self._entries.items():
+                    if (candidate.scope != scope or candidate.embedding is None
+                            or now - candidate.created_at > self.ttl):
+                        continue
+                    score = sum(a * b for a, b in zip(embedding, candidate.embedding))
+                    if score >= best_score:
+                        best_key, best_score = candidate_key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.semantic_hits += 1
+                    return self._entries[best_key].value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, question: Optional[str] = None, scope: Optional[str] = None) -> None:
+        """
+        Store a response.
+
+        Args:
+            key: Exact-match cache key
+            value: Response to cache
+            question: Optional question text for the semantic tier
+            scope: Key of everything besides the question; required for the semantic tier
+        """
+        entry = CacheEntry(value, time.time(), scope)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            if self._conn is not None:
+                self._persist(key, entry)
+        # Embedding is a network call; callers often store from inside a
+        # streaming response, so it is done in the background. The entry is
+        # served by exact key at once and joins the semantic tier when ready.
+        if question and scope and self.embed is not None:
+            _embedding_pool().submit(self._add_embedding, key, entry, question)
+
+    def _add_embedding(self, key: str, entry: CacheEntry, question: str) -> None:
+        embedding = self._embed(question)
+        if embedding is None:
+            return
+        with self._lock:
+            entry.embedding = embedding
+            if self._conn is not None and self._entries.get(key) is entry:
+                self._persist(key, entry)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current number of entries."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "size": len(self._entries)
+            }
+
+    def _open_store(self, db_path: str) -> None:
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS response_cache
+                                  (cache_key TEXT PRIMARY KEY,
+                                   scope TEXT,
+                                   embedding BLOB,
+                                   response TEXT NOT NULL,
+                                   created_at REAL NOT NULL)''')
+            self._conn.execute('DELETE FROM response_cache WHERE created_at < ?', (time.time() - self.ttl,))
+        rows = self._conn.execute('''SELECT cache_key, scope, embedding, response, created_at
+                                     FROM response_cache
+                                     ORDER BY created_at DESC LIMIT ?''', (self.maxsize,)).fetchall()
+        # Oldest first, so the most recent entries end up at the LRU's hot end
+        for cache_key, scope, embedding, response, created_at in reversed(rows):
+            value = orjson.loads(response) if orjson is not None else json.loads(response)
+            self._entries[cache_key] = CacheEntry(
+                tuple(value) if isinstance(value, list) else value,
+                created_at,
+                scope,
+                tuple(array('f', embedding)) if embedding else None
+            )
+
+    def _persist(self, key: str, entry: CacheEntry) -> None:
+        try:
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)',
+                    (key,
+                     entry.scope,
+                     array('f', entry.embedding).tobytes() if entry.embedding else None,
+                     orjson.dumps(entry.value).decode("utf-8") if orjson is not None
+                     else json.dumps(entry.value, ensure_ascii=False),
+                     entry.created_at))
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Could not persist cache entry: {e}")
+
+    def _embed(self, text: str) -> Optional[Tuple[float, ...]]:
+        if self.embed is None or time.monotonic() < self._embed_retry_at:
+            return None
+        try:
+            return self.embed(text)
+        except Exception as e:
+            # The semantic tier is best effort; fall back to exact matches only,
+            # and do not retry on every request while the service is failing.
+            self._embed_retry_at = time.monotonic() + EMBEDDING_RETRY_DELAY
+            logger.warning(f"Embedding failed, skipping semantic cache for {EMBEDDING_RETRY_DELAY}s: {e}")
+            return None
+
+class RequestAbandoned(RuntimeError):
+    """The owner of a coalesced request stopped before producing a result."""
+
+class InflightRequests:
+    """
+    Coalesce concurrent identical requests into a single upstream call.
+
+    The first caller for a key becomes its owner and performs the call;
+    callers arriving while it is in flight wait on the owner's future
+    instead of issuing a duplicate request.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key: str) -> Tuple[Future, bool]:
+        """
+        Register interest in a key.
+
+        Returns:
+            Tuple of (future, owner). The owner must resolve the future and
+            call release(); other callers wait on future.result() and claim
+            the key again if it raises RequestAbandoned.
+        """
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._pending[key] = future
+            return future, True
+
+    def release(self, key: str) -> None:
+        """Forget a key once its owner has finished, failing any waiters if it never resolved."""
+        with self._lock:
+            future = self._pending.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(RequestAbandoned("The coalesced request was abandoned"))
+
+    def run(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call fn(*args, **kwargs), sharing the result with identical concurrent calls."""
+        while True:
+            future, owner = self.claim(key)
+            if owner:
+                break
+            try:
+                return future.result()
+            except RequestAbandoned:
+                # The owner went away without failing; retry, usually as the new owner
+                continue
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self.release(key)
@@ -1,4 +1,5 @@
 import gradio as gr
+from cot_reflection import warm_up_model
 from cot_reflection_app import iface as iface1 # Assuming block1 is the Gradio block in file1
 from cot_reflection_file_app import (
     iface as iface2,
@@ -12,5 +13,9 @@ with gr.Blocks() as main_ui:
             iface2.render()  # Render the block from file2 inside its own tab
 
 if __name__ == "__main__":
+    warm_up_model()
     # Launch the app
-    main_ui.launch(share=False)
\ No newline at end of file
+    # Handlers run in Gradio's worker threads and spend nearly all their time
+    # waiting on model I/O, so allow far more of them than CPU-bound work would
+    main_ui.queue(default_concurrency_limit=48, max_size=64, api_open=False)
+    main_ui.launch(share=False, max_threads=64)
\ No newline at end of file
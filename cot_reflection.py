@@ -1,11 +1,53 @@
-import re
 import logging
 import argparse
-from vertexai.generative_models import GenerativeModel
-from reflection_gemini import query_gemini_pro
+import threading
+from functools import lru_cache
+from vertexai.generative_models import GenerationConfig, GenerativeModel
+from reflection_gemini import check_prompt_size, query_gemini_pro
+from cache import InflightRequests, RequestAbandoned, ResponseCache, make_key
 
 logger = logging.getLogger(__name__)
 
+MODEL_ID = "gemini-1.5-pro"
+# Temperature 0 keeps answers deterministic, which is what makes them cacheable
+DEFAULT_TEMPERATURE = 0.0
+# CoT answers rarely need more; the cap bounds worst-case generation time
+MAX_OUTPUT_TOKENS = 2048
+
+@lru_cache(maxsize=4)
+def get_model(model_id=MODEL_ID):
+    """Return a shared GenerativeModel so its client setup is paid once per model."""
+    return GenerativeModel(model_id)
+
+@lru_cache(maxsize=16)
+def generation_config(temperature=DEFAULT_TEMPERATURE):
+    """Return the GenerationConfig used for every CoT call at the given temperature."""
+    return GenerationConfig(temperature=temperature, max_output_tokens=MAX_OUTPUT_TOKENS, candidate_count=1)
+
+def warm_up_model(model_id=MODEL_ID):
+    """
+    Open the Gemini channel in the background with a one-token request.
+
+    Called at app startup so the first user request does not pay for
+    authentication and connection setup on top of generation.
+    """
+    def _ping():
+        try:
+            get_model(model_id).generate_content("ping", generation_config={"max_output_tokens": 1})
+        except Exception as e:
+            logger.warning(f"Model warm-up failed: {e}")
+
+    threading.Thread(target=_ping, daemon=True).start()
+
+# Shared across calls so repeated or paraphrased questions skip the API;
+# persisted to disk so restarts do not pay for the same questions again
+response_cache = ResponseCache(db_path="cot_cache.db")
+# Concurrent identical requests share one API call
+inflight_requests = InflightRequests()
+
+# Sections in the order the CoT prompt asks the model to emit them
+_SECTION_TAGS = tuple((tag, f"<{tag}>", f"</{tag}>") for tag in ("thinking", "reflection", "output"))
+
 system_prompt = """You are a legal assistant. Provide a detailed and accurate answer to the following question."""
 
 cot_prompt = """You are an AI assistant that uses a Chain of Thought (CoT) approach with reflection to answer queries. Follow these steps:
@@ -30,61 +72,228 @@ cot_prompt = """You are an AI assistant that uses a Chain of Thought (CoT) appro
     </output>
 """
 
-def cot_reflection(system_prompt, cot_prompt, question):
-    combined_prompt = f"""
-        {system_prompt}
+# Used when the CoT response has no <output> section
+FINAL_ANSWER_PROMPT = """
+Based on the following thinking and reflection, provide a concise final answer to the question: "{question}"
+
+Thinking:
+{thinking}
+
+Reflection:
+{reflection}
+
+Final answer:
+"""
+
+def _cache_keys(system_prompt, cot_prompt, question, temperature, additional_instructions):
+    cache_key = make_key(MODEL_ID, temperature, cot_prompt, system_prompt, additional_instructions, question)
+    cache_scope = make_key(MODEL_ID, temperature, cot_prompt, system_prompt, additional_instructions)
+    return cache_key, cache_scope
 
-        {cot_prompt}
+def _build_prompt(system_prompt, cot_prompt, question, additional_instructions=""):
+    # Keep the CoT instructions and the fixed system prompt at the very start:
+    # they do not change between calls, so Gemini can reuse the cached prefix.
+    # Anything per-request, including user-supplied instructions, goes last.
+    parts = [cot_prompt, "\n\n", system_prompt]
+    if additional_instructions:
+        parts += ["\n\nAdditional instructions: ", additional_instructions]
+    parts += ["\n\nQuestion: ", question]
+    return "".join(parts)
 
-        Question: {question}
+def extract_sections(full_response, partial=False):
     """
+    Split a CoT response into its thinking, reflection and output sections.
+
+    Each section is searched for on its own, so they may appear in any
+    order. An unclosed <output> section runs to the end of the text; with
+    partial=True the same applies to the other sections, which is what a
+    streaming UI wants to show.
+    """
+    sections = {}
+    for tag, open_tag, close_tag in _SECTION_TAGS:
+        start = full_response.find(open_tag)
+        if start == -1:
+            continue
+        start += len(open_tag)
+        end = full_response.find(close_tag, start)
+        if end == -1:
+            if not (partial or tag == "output"):
+                continue
+            end = len(full_response)
+        sections[tag] = full_response[start:end].strip()
+
+    return sections.get("thinking", ""), sections.get("reflection", ""), sections.get("output", "")
+
+class StreamingSectionParser:
+    """
+    Incremental counterpart of extract_sections(partial=True) for streamed text.
+
+    Each call to feed() only scans the text that arrived since the previous
+    call, instead of re-parsing the whole growing response on every chunk.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._sections = {}
+        self._closed = set()  # indexes into _SECTION_TAGS of sections already closed
+        self._open = None  # (index, content start) of the section being streamed
+        self._pos = 0
+
+    def feed(self, text):
+        """
+        Append a chunk and return the current (thinking, reflection, output).
+
+        Args:
+            text: Newly received text
+
+        Returns:
+            Tuple of (thinking, reflection, output), partial sections included
+        """
+        self.buffer += text
+        while len(self._closed) < len(_SECTION_TAGS):
+            if self._open is None:
+                # Whichever remaining section opens first is streamed next, so
+                # sections are picked up in any order
+                found = [(self.buffer.find(open_tag, self._pos), i)
+                         for i, (_, open_tag, _) in enumerate(_SECTION_TAGS) if i not in self._closed]
+                found = [(start, i) for start, i in found if start != -1]
+                if not found:
+                    # A tag may be split across chunks, so back off by its length
+                    self._pos = max(self._pos, len(self.buffer) - len("<reflection>"))
+                    break
+                start, index = min(found)
+                self._open = (index, start + len(_SECTION_TAGS[index][1]))
+                self._pos = self._open[1]
+
+            index, start = self._open
+            tag, _, close_tag = _SECTION_TAGS[index]
+            end = self.buffer.find(close_tag, self._pos)
+            if end == -1:
+                self._sections[tag] = self.buffer[start:].strip()
+                self._pos = max(self._pos, len(self.buffer) - len(close_tag))
+                break
+            self._sections[tag] = self.buffer[start:end].strip()
+            self._pos = end + len(close_tag)
+            self._open = None
+            self._closed.add(index)
+
+        return tuple(self._sections.get(tag, "") for tag, _, _ in _SECTION_TAGS)
+
+def _finalize_response(model, question, full_response, temperature):
+    logger.info(f"CoT with Reflection :\n{full_response}")
+
+    # Extract thinking, reflection, and output
+    thinking, reflection, output = extract_sections(full_response)
+    thinking = thinking or "No thinking process provided."
+    reflection = reflection or "No reflection process provided."
+
+    # If output is empty or not present, generate it using thinking and reflection
+    if not output:
+        output_prompt = FINAL_ANSWER_PROMPT.format(question=question, thinking=thinking, reflection=reflection)
+        output = query_gemini_pro(
+            prompt=output_prompt,
+            model=model,
+            return_full_response=False,
+            generation_config=generation_config(temperature)
+        )
+
+    logger.info(f"Final output :\n{output}")
 
+    return thinking, reflection, output
+
+def _run_cot_reflection(system_prompt, cot_prompt, question, temperature, additional_instructions, cache_key, cache_scope):
     # Make the API call
-    MODEL_ID = "gemini-1.5-pro"
-    model = GenerativeModel(MODEL_ID)
+    model = get_model(MODEL_ID)
     response = query_gemini_pro(
-        prompt=combined_prompt,
+        prompt=_build_prompt(system_prompt, cot_prompt, question, additional_instructions),
         model=model,
-        return_full_response=True  # Always get full response
+        return_full_response=True,  # Always get full response
+        generation_config=generation_config(temperature)
     )
 
     full_response = response
     if full_response is None:
         print("Error: No response received from the API.")
         return None, None, None
-    logger.info(f"CoT with Reflection :\n{full_response}")
 
-    # Extract thinking, reflection, and output
-    thinking_match = re.search(r'<thinking>(.*?)</thinking>', full_response, re.DOTALL)
-    reflection_match = re.search(r'<reflection>(.*?)</reflection>', full_response, re.DOTALL)
-    output_match = re.search(r'<output>(.*?)(?:</output>|$)', full_response, re.DOTALL)
+    thinking, reflection, output = _finalize_response(model, question, full_response, temperature)
+    if output and temperature == 0:
+        response_cache.set(cache_key, (thinking, reflection, output), question=question, scope=cache_scope)
 
-    thinking = thinking_match.group(1).strip() if thinking_match else "No thinking process provided."
-    reflection = reflection_match.group(1).strip() if reflection_match else "No reflection process provided."
-    output = output_match.group(1).strip() if output_match else ""
+    return thinking, reflection, output
 
-    # If output is empty or not present, generate it using thinking and reflection
-    if not output:
-        output_prompt = f"""
-        Based on the following thinking and reflection, provide a concise final answer to the question: "{question}"
+def cot_reflection(system_prompt, cot_prompt, question, temperature=DEFAULT_TEMPERATURE, additional_instructions=""):
+    cache_key, cache_scope = _cache_keys(system_prompt, cot_prompt, question, temperature, additional_instructions)
+    # Only deterministic answers are worth serving again
+    cached = response_cache.get(cache_key, question=question, scope=cache_scope) if temperature == 0 else None
+    if cached is not None:
+        logger.info(f"CoT with Reflection served from cache: {response_cache.stats()}")
+        return cached
 
-        Thinking:
-        {thinking}
+    return inflight_requests.run(
+        cache_key, _run_cot_reflection,
+        system_prompt, cot_prompt, question, temperature, additional_instructions, cache_key, cache_scope
+    )
 
-        Reflection:
-        {reflection}
+def stream_cot_reflection(system_prompt, cot_prompt, question, temperature=DEFAULT_TEMPERATURE, additional_instructions=""):
+    """
+    Streaming variant of cot_reflection.
 
-        Final answer:
-        """
-        output = query_gemini_pro(
-            prompt=output_prompt,
-            model=model,
-            return_full_response=False
-        )
+    Yields (thinking, reflection, output) tuples as tokens arrive from Gemini;
+    the last tuple yielded is the same result cot_reflection would return.
+    If the same request is already being streamed for another user, this
+    waits for that result instead of starting a second API call, and makes
+    the call itself if that user disconnects first.
+    """
+    cache_key, cache_scope = _cache_keys(system_prompt, cot_prompt, question, temperature, additional_instructions)
+    cached = response_cache.get(cache_key, question=question, scope=cache_scope) if temperature == 0 else None
+    if cached is not None:
+        logger.info(f"CoT with Reflection served from cache: {response_cache.stats()}")
+        yield cached
+        return
 
-    logger.info(f"Final output :\n{output}")
+    # If the owning client disconnects mid-stream its generator is closed and
+    # the request is released unresolved; waiters then claim the key again,
+    # and one of them takes over the API call
+    while True:
+        future, owner = inflight_requests.claim(cache_key)
+        if owner:
+            break
+        try:
+            result = future.result()
+        except RequestAbandoned:
+            continue
+        yield result
+        return
 
-    return thinking, reflection, output
+    try:
+        model = get_model(MODEL_ID)
+        prompt = _build_prompt(system_prompt, cot_prompt, question, additional_instructions)
+        check_prompt_size(model, prompt)
+        parser = StreamingSectionParser()
+        for chunk in model.generate_content(
+            contents=[prompt],
+            generation_config=generation_config(temperature),
+            stream=True
+        ):
+            yield parser.feed(chunk.text)
+        full_response = parser.buffer
+
+        if not full_response:
+            print("Error: No response received from the API.")
+            result = None, None, None
+        else:
+            result = _finalize_response(model, question, full_response, temperature)
+            if result[2] and temperature == 0:
+                response_cache.set(cache_key, result, question=question, scope=cache_scope)
+        future.set_result(result)
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        inflight_requests.release(cache_key)
+
+    yield result
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Apply CoT using AI reflection with Vertex AI Gemini Pro.")
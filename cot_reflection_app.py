@@ -1,56 +1,69 @@
 import gradio as gr
-import os
 import re
-from cot_reflection import cot_reflection, cot_prompt as default_cot_prompt, system_prompt as default_system_prompt
-from vertexai.generative_models import GenerativeModel
+from concurrent.futures import ThreadPoolExecutor
+from cot_reflection import stream_cot_reflection, get_model, generation_config, warm_up_model, inflight_requests, cot_prompt as default_cot_prompt, system_prompt as default_system_prompt
 from reflection_gemini import query_gemini_pro
+from cache import make_key
+from ui_utils import build_header, build_output_row
 
-def process_question(user_prompt, system_prompt, cot_prompt):
+# Runs the optional baseline-answer call while the CoT response is being streamed
+executor = ThreadPoolExecutor(max_workers=8)
+
+_THINKING_RE = re.compile(r'<thinking>(.*?)</thinking>', re.DOTALL)
+
+def process_question(user_prompt, system_prompt, cot_prompt, additional_instructions="", temperature=0.0,
+                     separate_initial_response=False):
     try:
-        # Get thinking, reflection, and output from cot_reflection
-        thinking, reflection, output = cot_reflection(
+        # The CoT <output> already is a concise answer, so by default it doubles as the
+        # initial response. A separate no-CoT baseline costs a second call and is opt-in.
+        initial_future = None
+        if separate_initial_response:
+            extra = f"Additional instructions: {additional_instructions}\n\n" if additional_instructions else ""
+            initial_response_prompt = f"{system_prompt}\n\n{extra}Question: {user_prompt}\n\nProvide a concise answer to this question without any explanation or reasoning."
+            initial_future = executor.submit(
+                inflight_requests.run,
+                make_key("gemini-1.5-pro", temperature, initial_response_prompt),
+                query_gemini_pro,
+                prompt=initial_response_prompt,
+                model=get_model("gemini-1.5-pro"),
+                return_full_response=False,
+                generation_config=generation_config(temperature)
+            )
+
+        # Stream thinking, reflection, and output from cot_reflection as they arrive
+        thinking, reflection, output = "", "", ""
+        for thinking, reflection, output in stream_cot_reflection(
             system_prompt=system_prompt,
             cot_prompt=cot_prompt,
-            question=user_prompt
-        )
+            question=user_prompt,
+            temperature=temperature,
+            additional_instructions=additional_instructions
+        ):
+            initial_response = initial_future.result() if initial_future and initial_future.done() else ""
+            # Leave the prompt boxes alone until the final yield
+            yield user_prompt, initial_response or "", thinking or "", reflection or "", output or "", gr.update(), gr.update()
         print(f"thinking: {thinking}/n")
         print(f"reflection: {reflection}/n")
         print(f"output: {output}/n")
         # Extract the actual thinking content
-        thinking_match = re.search(r'<thinking>(.*?)</thinking>', thinking, re.DOTALL)
+        thinking_match = _THINKING_RE.search(thinking)
         actual_thinking = thinking_match.group(1).strip() if thinking_match else thinking
 
-        # Get the initial response (direct answer to the question)
-        initial_response_prompt = f"{system_prompt}\n\nQuestion: {user_prompt}\n\nProvide a concise answer to this question without any explanation or reasoning."
-        initial_response = query_gemini_pro(prompt=initial_response_prompt, model=GenerativeModel("gemini-1.5-pro"), return_full_response=False)
+        initial_response = initial_future.result() if initial_future else output
 
-        
         # If any section is empty, provide a default message
         initial_response = initial_response if initial_response else "No initial response provided."
         actual_thinking = actual_thinking if actual_thinking else "No thinking process provided."
         reflection = reflection if reflection else "No reflection process provided."
         output = output if output else "No final output provided."
 
-        return user_prompt, initial_response, actual_thinking, reflection, output, system_prompt, cot_prompt
+        yield user_prompt, initial_response, actual_thinking, reflection, output, system_prompt, cot_prompt
     except Exception as e:
-        return user_prompt, f"An error occurred: {str(e)}", "", "", "", system_prompt, cot_prompt
-
-# Get the absolute path to the logo file
-current_dir = os.path.dirname(os.path.abspath(__file__))
-logo_path = os.path.join(current_dir, "images", "Linklaters.svg.png")
+        yield user_prompt, f"An error occurred: {str(e)}", "", "", "", system_prompt, cot_prompt
 
 # Gradio interface
 with gr.Blocks() as iface:
-    with gr.Column(scale=1):
-        gr.Image(logo_path, show_label=False, height=70)
-    
-    # Add empty space
-    gr.Markdown("<br><br>")
-    
-    gr.Markdown("""
-    <h1 style='text-align: center; margin-bottom: 0;'>MVP for Chain of Thought Reflection Assistant</h1>
-    <p style='text-align: center; font-style: italic; margin-top: 5px; font-size: 1.2em;'>powered by Linklaters GenAI Platform</p>
-    """)
+    build_header("MVP for Chain of Thought Reflection Assistant")
     
     with gr.Row():
         with gr.Column():
@@ -60,30 +73,48 @@ with gr.Blocks() as iface:
                     label="",  # Set an empty label
                     placeholder="Ask a question and get a detailed answer using Chain of Thought reflection powered by Linklaters GenAI Platform."
                 )
+                # Fixed so the prompt prefix stays cacheable; per-user tweaks go below
                 system_prompt = gr.Textbox(
                     lines=2,
                     label="System Prompt",
-                    value=default_system_prompt
+                    value=default_system_prompt,
+                    interactive=False
+                )
+                additional_instructions = gr.Textbox(
+                    lines=2,
+                    label="Additional Instructions",
+                    placeholder="Optional extra guidance, appended after the system prompt."
                 )
                 cot_prompt = gr.Textbox(
                     lines=4,
                     label="Chain of Thought Prompt",
                     value=default_cot_prompt
                 )
+                temperature = gr.Slider(
+                    minimum=0.0,
+                    maximum=1.0,
+                    step=0.1,
+                    value=0.0,
+                    label="Temperature",
+                    info="Answers are only cached at temperature 0"
+                )
+                separate_initial_response = gr.Checkbox(
+                    label="Generate a separate initial response without CoT (extra model call)",
+                    value=False
+                )
             submit_btn = gr.Button("Submit")
     
-    with gr.Row():
-        user_prompt_output = gr.Textbox(label="1. User Prompt")
-        initial_response_output = gr.Textbox(label="2. Initial Response")
-        thinking_output = gr.Textbox(label="3. Thinking")
-        reflection_output = gr.Textbox(label="4. Reflection")
-        final_output = gr.Textbox(label="5. Final Output")
+    user_prompt_output, initial_response_output, thinking_output, reflection_output, final_output = build_output_row()
     
     submit_btn.click(
         fn=process_question,
-        inputs=[user_prompt, system_prompt, cot_prompt],
+        inputs=[user_prompt, system_prompt, cot_prompt, additional_instructions, temperature, separate_initial_response],
         outputs=[user_prompt_output, initial_response_output, thinking_output, reflection_output, final_output, system_prompt, cot_prompt]
     )
 
 if __name__ == "__main__":
-    iface.launch(share=False)
\ No newline at end of file
+    warm_up_model()
+    # Handlers run in Gradio's worker threads and spend nearly all their time
+    # waiting on model I/O, so allow far more of them than CPU-bound work would
+    iface.queue(default_concurrency_limit=48, max_size=64, api_open=False)
+    iface.launch(share=False, max_threads=64)
\ No newline at end of file
@@ -2,21 +2,54 @@ import gradio as gr
 import os
 import re
 import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from operator import itemgetter
 from typing import Optional, List, Any, Dict, Tuple
 from cot_reflection_file import (
-    cot_reflection, 
+    stream_cot_reflection,
     cot_prompt as default_cot_prompt, 
     system_prompt as default_system_prompt,
-    get_model_response,
+    cached_model_response,
+    stream_model_response,
+    build_initial_response_prompt,
+    document_prefix,
+    check_document_size,
+    is_error_response,
     AVAILABLE_MODELS
 )
-from document_utils import read_document
-from db_utils import SnapshotDB
+from document_utils import file_digest, read_document
+from cache import ResponseCache, make_key
+from db_utils import SnapshotDB, TABLE_COLUMNS
+from ui_utils import build_output_row
 
 # Initialize database
 db = SnapshotDB()
 
+_THINKING_RE = re.compile(r'<thinking>(.*?)</thinking>', re.DOTALL)
+
+# Submissions that may be running model calls at once, across all sessions
+LLM_CONCURRENCY_LIMIT = 16
+# Runs the initial-response call alongside the CoT chain, one per submission
+executor = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY_LIMIT)
+
+# Finished process_question results, keyed on the model, prompts and document hash;
+# paraphrased questions about the same inputs match through the semantic tier
+result_cache = ResponseCache(maxsize=512)
+
+# Snapshot table pages per (search term, page), as (loaded_at, rows, total matches)
+SNAPSHOT_TABLE_TTL = 15
+SNAPSHOT_TABLE_CACHE_SIZE = 64
+# Rows per page of the snapshots table, newest first
+TABLE_PAGE_SIZE = 50
+# Seconds between background refreshes of an open snapshots table; shorter than
+# SNAPSHOT_TABLE_TTL so most ticks are answered from the cache
+TABLE_REFRESH_INTERVAL = 5
+_snapshot_table_cache: Dict[Tuple[str, int], Tuple[float, List[List], int]] = {}
+EXPORT_PATH = 'snapshots_export.json'
+
 def get_available_models() -> List[str]:
     """
     Get list of available models.
@@ -26,7 +59,8 @@ def get_available_models() -> List[str]:
     """
     return list(AVAILABLE_MODELS.keys())
 
-def process_question(file, user_prompt, system_prompt, cot_prompt, selected_model, use_default_cot):
+def process_question(file, user_prompt, system_prompt, cot_prompt, selected_model, use_default_cot,
+                     match_similar=True, bypass_cache=False):
     """
     Process user question using selected model and prompts.
     
@@ -37,59 +71,113 @@ def process_question(file, user_prompt, system_prompt, cot_prompt, selected_mode
         cot_prompt: Chain of thought prompt
         selected_model: Name of selected model
         use_default_cot: Boolean indicating if default CoT prompt should be used
+        match_similar: Whether cached answers to similar questions may be reused
+        bypass_cache: Skip every cache lookup and call the model again; the
+            fresh answers still replace the cached ones
         
-    Returns:
-        Tuple of processed outputs
+    Yields:
+        Tuple of processed outputs, updated as the responses stream in
     """
     try:
         # Validate model selection
         if selected_model not in AVAILABLE_MODELS:
             raise ValueError(f"Invalid model selected: {selected_model}")
             
+        # Identical, or with match_similar also paraphrased, submissions are answered
+        # from the result cache without parsing the document or calling the model again.
+        # Paraphrases are matched only here, on the whole result: the per-stage
+        # model caches are exact, so stages of different questions never mix.
+        result_scope = make_key(
+            selected_model, system_prompt, default_cot_prompt if use_default_cot else None,
+            file_digest(file.name) if file is not None else ""
+        )
+        result_key = make_key(result_scope, user_prompt)
+        cached = None if bypass_cache else result_cache.get(
+            result_key, question=user_prompt if match_similar else None, scope=result_scope
+        )
+        if cached is not None:
+            yield cached
+            return
+
         # Read document content if file is provided
         document_content = None
         if file is not None:
             document_content = read_document(file.name)
+            check_document_size(selected_model, document_content)
+
+        # Both branches send the same initial-response prompt; the document is
+        # copied into its prefix once, and that prefix is marked for caching
+        prefix = document_prefix(system_prompt, document_content)
+        initial_response_prompt = build_initial_response_prompt(prefix, user_prompt)
 
         # If the checkbox is checked, use CoT logic
         if use_default_cot:
-            # If the checkbox is checked, generate an initial response without CoT
-            doc_content = f"Document Content:\n{document_content}\n\n" if document_content else ""
-            initial_response_prompt = (f"{system_prompt}\n\n{doc_content}"
-                                       f"Question: {user_prompt}\n\n"
-                                       "Provide a concise answer to this question without any explanation or reasoning.")
-            initial_response = get_model_response(selected_model, initial_response_prompt)            
-            # Get thinking, reflection, and output from cot_reflection
-            thinking, reflection, output = cot_reflection(
+            # The initial response and the CoT chain are independent, so run them concurrently
+            initial_future = executor.submit(
+                cached_model_response,
+                selected_model, initial_response_prompt,
+                cached_prefix=prefix,
+                use_cache=not bypass_cache
+            )
+            # Stream thinking, reflection, and output from cot_reflection as they arrive
+            initial_response, actual_thinking, reflection, output = "", "", "", ""
+            for thinking, reflection, output in stream_cot_reflection(
                 system_prompt=system_prompt,
                 cot_prompt=default_cot_prompt,  # Use default CoT prompt
                 question=user_prompt,
                 document_content=document_content,
-                model_name=selected_model
-            )
+                model_name=selected_model,
+                use_cache=not bypass_cache
+            ):
+                if not initial_response and initial_future.done():
+                    initial_response = initial_future.result()
+
+                # Extract the actual thinking content
+                thinking_match = _THINKING_RE.search(thinking)
+                actual_thinking = thinking_match.group(1).strip() if thinking_match else thinking
 
-            # Extract the actual thinking content
-            thinking_match = re.search(r'<thinking>(.*?)</thinking>', thinking, re.DOTALL)
-            actual_thinking = thinking_match.group(1).strip() if thinking_match else thinking
+                # The prompt boxes are only echoed back once, with the last update;
+                # gr.update() leaves them untouched, so they are not re-sent per chunk
+                yield user_prompt, initial_response, actual_thinking, reflection, output, gr.update(), gr.update()
+
+            if not (actual_thinking or reflection or output):
+                raise ValueError(f"{selected_model} returned an empty response")
 
             # Return all outputs related to CoT
-            return user_prompt, initial_response, actual_thinking, reflection, output, system_prompt, default_cot_prompt
+            result = user_prompt, initial_future.result(), actual_thinking, reflection, output, system_prompt, default_cot_prompt
         else:
             # If the checkbox is not checked, generate a response without CoT
-            doc_content = f"Document Content:\n{document_content}\n\n" if document_content else ""
-            initial_response_prompt = (f"{system_prompt}\n\n{doc_content}"
-                                       f"Question: {user_prompt}\n\n"
-                                       "Provide a concise answer to this question without any explanation or reasoning.")
-            initial_response = get_model_response(selected_model, initial_response_prompt)
+            result = user_prompt, "", "", "", "", system_prompt, None
+            for initial_response in stream_model_response(
+                selected_model, initial_response_prompt,
+                cached_prefix=prefix,
+                use_cache=not bypass_cache
+            ):
+                # Return only the user prompt and initial response, with empty strings for CoT outputs
+                result = user_prompt, initial_response, "", "", "", system_prompt, None  # No CoT prompt used, Final Output as empty string
+                yield result[:5] + (gr.update(), gr.update())
 
-            # Return only the user prompt and initial response, with empty strings for CoT outputs
-            return user_prompt, initial_response, "", "", "", system_prompt, None  # No CoT prompt used, Final Output as empty string
+        if not any(is_error_response(selected_model, text) for text in result[1:5]):
+            result_cache.set(result_key, result, question=user_prompt, scope=result_scope)
+        yield result
 
     except Exception as e:
         print(f"Process error: {str(e)}")
-        return user_prompt, f"An error occurred: {str(e)}", "", "", "", None  # No CoT prompt used, Final Output as empty string
+        yield user_prompt, f"An error occurred: {str(e)}", "", "", "", system_prompt, None  # No CoT prompt used, Final Output as empty string
+
+# Snapshot columns filled into the form by load_snapshot_by_id, ahead of its status message
+LOADED_FIELDS = (
+    "snapshot_name", "user_prompt", "system_prompt", "model_name", "cot_prompt",
+    "initial_response", "thinking", "reflection", "final_response"
+)
+LOADED_FIELD_COUNT = len(LOADED_FIELDS)
+_loaded_values = itemgetter(*LOADED_FIELDS)
 
-def load_snapshot_by_id(snapshot_id: str) -> List[Optional[Any]]:
+def _load_failed(message: str) -> tuple:
+    # Leave the form as it is and only report the problem
+    return (*(gr.update() for _ in range(LOADED_FIELD_COUNT)), message)
+
+def load_snapshot_by_id(snapshot_id: str) -> Tuple[Optional[Any], ...]:
     """
     Load a snapshot by ID and update UI components.
     
@@ -101,54 +189,240 @@ def load_snapshot_by_id(snapshot_id: str) -> List[Optional[Any]]:
     """
     try:
         if not snapshot_id:
-            return [None] * 9 + ["Please enter a snapshot ID to load"]
+            return _load_failed("Please enter a snapshot ID to load")
         
         try:
             snapshot_id_int = int(snapshot_id)
         except ValueError:
-            return [None] * 9 + ["Invalid Snapshot ID. Please enter a numeric ID."]
+            return _load_failed("Invalid Snapshot ID. Please enter a numeric ID.")
         
         # Get snapshot data from database
         snapshot_data = db.get_snapshot_by_id(snapshot_id_int)
         
         if not snapshot_data:
-            return [None] * 9 + ["Snapshot not found"]
+            return _load_failed("Snapshot not found")
             
-        # Extract values from snapshot data
-        return [
-            snapshot_data.get("snapshot_name", ""),          # Snapshot name
-            snapshot_data.get("user_prompt", ""),            # User prompt
-            snapshot_data.get("system_prompt", ""),          # System prompt
-            snapshot_data.get("model_name", ""),             # Model name
-            snapshot_data.get("cot_prompt", ""),             # Chain of thought prompt
-            snapshot_data.get("initial_response", ""),       # Initial response
-            snapshot_data.get("thinking", ""),               # Thinking process
-            snapshot_data.get("reflection", ""),             # Reflection
-            snapshot_data.get("final_response", ""),         # Final response
-            "✓ Snapshot loaded successfully"                 # Status message
-        ]
+        # get_snapshot_by_id returns every column, so all the form fields are present
+        return (*_loaded_values(snapshot_data), "✓ Snapshot loaded successfully")
     except Exception as e:
         print(f"Load error: {str(e)}")
-        return [None] * 9 + [f"Error loading snapshot: {str(e)}"]
+        return _load_failed(f"Error loading snapshot: {str(e)}")
+
+def update_snapshots_table(search_term: str = "", page: int = 1) -> Tuple[Dict[str, Any], Any]:
+    """
+    Update the snapshots table with one page of filtered results.
+    
+    Only TABLE_PAGE_SIZE rows are read and sent to the browser, however
+    many snapshots match. Pages are reused for SNAPSHOT_TABLE_TTL seconds,
+    so a burst of keystrokes in the search box does not query the database
+    every time.
+    
+    Args:
+        search_term: Optional search term to filter snapshots
+        page: 1-based page number
+        
+    Returns:
+        Tuple of (table update, status update). On a database error the
+        table is left as it is and the error is shown as the status.
+    """
+    try:
+        return _read_table_page(search_term, page), gr.update()
+    except Exception as e:
+        print(f"Table update error: {str(e)}")
+        return gr.update(), f"Error loading snapshots: {str(e)}"
 
-def update_snapshots_table(search_term: str = "") -> List[List]:
+def _read_table_page(search_term: str, page: int) -> Dict[str, Any]:
+    # Raises on database errors, including those safe_db_operation returns as text
+    page = max(int(page or 1), 1)
+    now = time.monotonic()
+    cached = _snapshot_table_cache.get((search_term, page))
+    if cached and now - cached[0] < SNAPSHOT_TABLE_TTL:
+        return _table_page(cached[1], page, cached[2])
+    
+    rows = db.get_snapshot_summaries(search_term, limit=TABLE_PAGE_SIZE, offset=(page - 1) * TABLE_PAGE_SIZE)
+    if isinstance(rows, str):
+        raise RuntimeError(rows)
+    total = db.count_snapshots(search_term)
+    if len(_snapshot_table_cache) >= SNAPSHOT_TABLE_CACHE_SIZE:
+        _snapshot_table_cache.clear()
+    _snapshot_table_cache[(search_term, page)] = (now, rows, total)
+    return _table_page(rows, page, total)
+
+def _table_page(rows: List[List], page: int, total: int) -> Dict[str, Any]:
+    pages = max(math.ceil(total / TABLE_PAGE_SIZE), 1)
+    return gr.update(value=rows, label=f"Saved Snapshots (page {page} of {pages}, {total} total)")
+
+def search_snapshots(search_term: str) -> Tuple[Dict[str, Any], int, Any]:
     """
-    Update the snapshots table with filtered results.
+    Show the first page of snapshots matching a new search term.
+    
+    Args:
+        search_term: Search term to filter snapshots
+        
+    Returns:
+        Tuple of (table update, page number, status update)
+    """
+    table, status = update_snapshots_table(search_term)
+    return table, 1, status
+
+def refresh_snapshots_table(search_term: str = "", page: int = 1) -> Tuple[Dict[str, Any], Any]:
+    """
+    Drop cached table results and reload them from the database.
     
     Args:
         search_term: Optional search term to filter snapshots
+        page: 1-based page number
         
     Returns:
-        List of snapshot data for table display
+        Tuple of (table update, status update)
     """
-    snapshots = db.get_snapshots(search_term)
-    return [[s[0], s[1], s[10], s[4], s[2], s[11]] for s in snapshots]
+    _snapshot_table_cache.clear()
+    return update_snapshots_table(search_term, page)
+
+def _shown_rows(rows: List[List]) -> List[List]:
+    # An empty Dataframe comes back as a single blank row
+    return [row for row in rows or [] if row and row[0] not in ("", None)]
+
+def save_snapshot(snapshot_name, user_prompt, system_prompt, model_name, cot_prompt,
+                  initial_response, thinking, reflection, final_response, tags,
+                  search_term: str, page: int, current_rows: List[List]) -> Tuple[str, Any]:
+    """
+    Save the current analysis as a snapshot and add it to the table.
+    
+    On the unfiltered first page the new row is placed on top of the rows
+    already shown instead of reloading the table; otherwise the page is
+    reloaded, since the new snapshot may not belong on it.
+    
+    Args:
+        snapshot_name: Name for the snapshot
+        user_prompt: User's question
+        system_prompt: System context
+        model_name: Name of the model used
+        cot_prompt: Chain of thought prompt
+        initial_response: Initial response
+        thinking: Thinking process
+        reflection: Reflection
+        final_response: Final response
+        tags: Comma-separated tags
+        search_term: Current contents of the search box
+        page: Page of the snapshots table being shown
+        current_rows: Rows currently shown in the snapshots table
+        
+    Returns:
+        Tuple of (status message, table update)
+    """
+    try:
+        row = db.insert_snapshot({
+            'snapshot_name': snapshot_name,
+            'user_prompt': user_prompt,
+            'system_prompt': system_prompt,
+            'model_name': model_name,
+            'cot_prompt': cot_prompt,
+            'initial_response': initial_response,
+            'thinking': thinking,
+            'reflection': reflection,
+            'final_response': final_response,
+            'tags': tags
+        })
+    except Exception as e:
+        return f"Error saving snapshot: {str(e)}", gr.update()
+    
+    _snapshot_table_cache.clear()
+    try:
+        if search_term or int(page or 1) != 1:
+            table = _read_table_page(search_term, page)
+        else:
+            # The new row pushes the page's last row onto page two
+            rows = ([TABLE_COLUMNS(row)] + _shown_rows(current_rows))[:TABLE_PAGE_SIZE]
+            table = _table_page(rows, 1, db.count_snapshots())
+    except Exception as e:
+        return f"✓ Snapshot saved, but the table could not be reloaded: {str(e)}", gr.update()
+    return "✓ Snapshot saved successfully", table
+
+def select_snapshot(selected_ids: List[int], evt: gr.SelectData) -> Tuple[List[int], str]:
+    """
+    Toggle the clicked row's snapshot in the set marked for deletion.
+    
+    Selections are kept by ID rather than read back from the table, so a
+    background refresh of the table cannot change what gets deleted.
+    
+    Args:
+        selected_ids: IDs currently marked for deletion
+        evt: Select event for the clicked table cell
+        
+    Returns:
+        Tuple of (updated IDs, status message)
+    """
+    row = evt.row_value
+    if not row or row[0] in ("", None):
+        return selected_ids, gr.update()
+    snapshot_id = int(row[0])
+    if snapshot_id in selected_ids:
+        selected_ids = [i for i in selected_ids if i != snapshot_id]
+    else:
+        selected_ids = selected_ids + [snapshot_id]
+    if not selected_ids:
+        return selected_ids, "No snapshots selected"
+    return selected_ids, "Selected for deletion: " + ", ".join(map(str, selected_ids))
+
+def delete_snapshots(selected_ids: List[int], search_term: str = "", page: int = 1) -> Tuple[str, Any, List[int]]:
+    """
+    Delete the selected snapshots and reload the table page.
+    
+    Rows from later pages move up to take the deleted rows' place, so the
+    page is read again rather than filtered locally.
+    
+    Args:
+        selected_ids: IDs marked for deletion by select_snapshot
+        search_term: Current contents of the search box
+        page: Page of the snapshots table being shown
+        
+    Returns:
+        Tuple of (status message, table update, cleared selection)
+    """
+    if not selected_ids:
+        return "Click rows in the table to select snapshots to delete", gr.update(), selected_ids
+    try:
+        db.delete_snapshots(set(selected_ids))
+    except Exception as e:
+        return f"Error deleting snapshots: {str(e)}", gr.update(), selected_ids
+    
+    _snapshot_table_cache.clear()
+    try:
+        table = _read_table_page(search_term, page)
+    except Exception as e:
+        return f"✓ Selected snapshots deleted, but the table could not be reloaded: {str(e)}", gr.update(), []
+    return "✓ Selected snapshots deleted successfully", table, []
+
+def start_table_timer():
+    """Resume background table refreshes while the Saved Snapshots tab is open."""
+    return gr.Timer(active=True)
+
+def stop_table_timer():
+    """Pause background table refreshes while the tab is hidden."""
+    return gr.Timer(active=False)
+
+def export_snapshots() -> str:
+    """
+    Export all snapshots to EXPORT_PATH.
+    
+    Rows are streamed from the database to the file, so the export is not
+    built in memory or sent back to the browser.
+    
+    Returns:
+        Status message
+    """
+    try:
+        count = db.export_snapshots_to_file(EXPORT_PATH)
+    except Exception as e:
+        return f"Error exporting snapshots: {str(e)}"
+    return f"✓ Exported {count} snapshots to '{EXPORT_PATH}'"
 
 # Gradio interface
 with gr.Blocks(theme=gr.themes.Soft()) as iface:
     with gr.Tabs():
         # Analysis Tab
-        with gr.TabItem("Analysis"):
+        with gr.TabItem("Analysis") as analysis_tab:
             with gr.Row():
                 with gr.Column():
                     # Use the explicitly defined models list
@@ -174,6 +448,16 @@ with gr.Blocks(theme=gr.themes.Soft()) as iface:
                         label="Use Default Chain of Thought Prompt",
                         value=False
                     )
+                    match_similar = gr.Checkbox(
+                        label="Reuse answers to similar questions",
+                        value=True,
+                        info="Untick to always get a fresh answer for a reworded question"
+                    )
+                    bypass_cache = gr.Checkbox(
+                        label="Bypass cache",
+                        value=False,
+                        info="Call the model even for a question answered before; the new answer is cached"
+                    )
                     submit_btn = gr.Button("Submit", variant="primary")
                     
                     with gr.Accordion("System and Chain-of-Thought Prompts", open=False):
@@ -189,12 +473,7 @@ with gr.Blocks(theme=gr.themes.Soft()) as iface:
                         )
 
 
-            with gr.Row():
-                user_prompt_output = gr.Textbox(label="1. User Prompt", interactive=False)
-                initial_response_output = gr.Textbox(label="2. Initial Response", interactive=False)
-                thinking_output = gr.Textbox(label="3. Thinking", interactive=False)
-                reflection_output = gr.Textbox(label="4. Reflection", interactive=False)
-                final_output = gr.Textbox(label="5. Final Output", interactive=False)
+            user_prompt_output, initial_response_output, thinking_output, reflection_output, final_output = build_output_row(interactive=False)
 
             with gr.Row():
                 snapshot_name = gr.Textbox(
@@ -214,18 +493,34 @@ with gr.Blocks(theme=gr.themes.Soft()) as iface:
                 )
 
         # Saved Snapshots Tab
-        with gr.TabItem("Saved Snapshots"):
+        with gr.TabItem("Saved Snapshots") as snapshots_tab:
+            # Picks up snapshots saved or deleted in other sessions. Ticks come
+            # from every open Saved Snapshots tab but share the TTL table cache,
+            # so each page is read from the database at most once per TTL.
+            table_timer = gr.Timer(TABLE_REFRESH_INTERVAL, active=False)
+            # Snapshot IDs marked for deletion by clicking table rows
+            selected_ids = gr.State([])
             with gr.Row():
                 search_box = gr.Textbox(
                     label="Search Snapshots",
-                    placeholder="Search by name, prompt, or tags..."
+                    placeholder="Search by name, prompt, or tags...",
+                    scale=4
+                )
+                page_number = gr.Number(
+                    label="Page",
+                    value=1,
+                    minimum=1,
+                    precision=0,
+                    scale=1
                 )
             
             snapshots_table = gr.Dataframe(
                 headers=["ID", "Name", "Created At", "Model", "Prompt", "Tags"],
-                interactive=True,
+                # Read-only: the timer replaces its value, and rows are
+                # picked for deletion by clicking them instead
+                interactive=False,
                 label="Saved Snapshots",
-                value=update_snapshots_table(),
+                value=[],  # Filled on page load by iface.load below
                 type="array",
                 datatype=["number", "str", "str", "str", "str", "str"]
             )
@@ -248,32 +543,23 @@ with gr.Blocks(theme=gr.themes.Soft()) as iface:
 
     # Connect components
     submit_btn.click(
-        fn=lambda *args: process_question(*args) if args[4] in get_available_models() else 
-            (args[0], "Error: Invalid model selected", "", "", "", args[2], args[3], args[5]),
-        inputs=[file_input, user_prompt, system_prompt, cot_prompt, model_selector, use_default_cot],
+        # process_question validates the model itself; it must be passed directly
+        # (not wrapped in a lambda) for Gradio to stream its output
+        fn=process_question,
+        inputs=[file_input, user_prompt, system_prompt, cot_prompt, model_selector, use_default_cot, match_similar, bypass_cache],
         outputs=[user_prompt_output, initial_response_output, thinking_output, 
-                reflection_output, final_output, system_prompt, cot_prompt]
+                reflection_output, final_output, system_prompt, cot_prompt],
+        # Bounds calls to the model providers; snapshot browsing keeps its own slots
+        concurrency_limit=LLM_CONCURRENCY_LIMIT,
+        concurrency_id="llm"
     )
     
     save_btn.click(
-        fn=lambda *args: (
-            db.save_snapshot({
-                'snapshot_name': args[0],
-                'user_prompt': args[1],
-                'system_prompt': args[2],
-                'model_name': args[3],
-                'cot_prompt': args[4],
-                'initial_response': args[5],
-                'thinking': args[6],
-                'reflection': args[7],
-                'final_response': args[8],
-                'tags': args[9]
-            }),
-            update_snapshots_table()
-        ),
+        fn=save_snapshot,
         inputs=[snapshot_name, user_prompt_output, system_prompt, 
                 model_selector, cot_prompt, initial_response_output,
-                thinking_output, reflection_output, final_output, tags_input],
+                thinking_output, reflection_output, final_output, tags_input,
+                search_box, page_number, snapshots_table],
         outputs=[snapshot_status, snapshots_table]
     )
     
@@ -295,28 +581,69 @@ with gr.Blocks(theme=gr.themes.Soft()) as iface:
     )
     
     search_box.change(
-        fn=update_snapshots_table,
+        fn=search_snapshots,
         inputs=[search_box],
-        outputs=snapshots_table
+        outputs=[snapshots_table, page_number, operation_status],
+        trigger_mode="always_last",  # Skip intermediate keystrokes while a query is running
+        show_progress="hidden"
     )
     
-    refresh_btn.click(
+    # .input rather than .change, so resetting the page on a new search
+    # does not query the first page a second time
+    page_number.input(
         fn=update_snapshots_table,
-        inputs=[search_box],
-        outputs=snapshots_table
+        inputs=[search_box, page_number],
+        outputs=[snapshots_table, operation_status],
+        trigger_mode="always_last",
+        show_progress="hidden"
+    )
+    
+    refresh_btn.click(
+        fn=refresh_snapshots_table,
+        inputs=[search_box, page_number],
+        outputs=[snapshots_table, operation_status]
+    )
+    
+    snapshots_table.select(
+        fn=select_snapshot,
+        inputs=[selected_ids],
+        outputs=[selected_ids, operation_status]
     )
     
     delete_btn.click(
-        fn=lambda *args: db.delete_selected_snapshots(*args),
-        inputs=[snapshots_table],
-        outputs=[operation_status, snapshots_table]
+        fn=delete_snapshots,
+        inputs=[selected_ids, search_box, page_number],
+        outputs=[operation_status, snapshots_table, selected_ids]
     )
     
     export_btn.click(
-        fn=lambda: db.export_snapshots(),
+        fn=export_snapshots,
         inputs=[],
         outputs=operation_status
     )
+    
+    table_timer.tick(
+        fn=update_snapshots_table,
+        inputs=[search_box, page_number],
+        outputs=[snapshots_table, operation_status],
+        trigger_mode="always_last",
+        show_progress="hidden"
+    )
+    snapshots_tab.select(fn=start_table_timer, outputs=table_timer)
+    analysis_tab.select(fn=stop_table_timer, outputs=table_timer)
+    
+    # Query snapshots per page load rather than once while building the UI at
+    # import, so startup does not wait on the database and new visitors see
+    # current rows
+    iface.load(
+        fn=update_snapshots_table,
+        inputs=[search_box, page_number],
+        outputs=[snapshots_table, operation_status],
+        show_progress="hidden"
+    )
 
 if __name__ == "__main__":
-    iface.launch(share=False)
\ No newline at end of file
+    # Handlers run in Gradio's worker threads and spend nearly all their time
+    # waiting on model I/O, so allow far more of them than CPU-bound work would
+    iface.queue(default_concurrency_limit=48, max_size=64, api_open=False)
+    iface.launch(share=False, max_threads=64)
\ No newline at end of file
@@ -1,10 +1,8 @@
-from app_config import LLM_API_KEYS
-from litellm import completion
+from functools import lru_cache
+from typing import Iterator
+from cache import InflightRequests, ResponseCache, make_key
 import re
 import os
-from vertexai.generative_models import GenerativeModel
-from anthropic import AnthropicVertex
-from openai import AzureOpenAI
 
 # Initialize models with their deployment names
 AVAILABLE_MODELS = {
@@ -16,50 +14,281 @@ AVAILABLE_MODELS = {
     "OpenAI gpt-4o":        ("azure_ai",        "azure_ai/gpt-4o",                          "https://swedencentral.api.cognitive.microsoft.com/openai/deployments/gpt-4o/chat/completions?api-version=2024-08-01-preview")
 }
 
-def get_model_response(model_name: str, prompt: str) -> str:
+# Context window of each model, in tokens
+MODEL_CONTEXT_TOKENS = {
+    "Gemini 2.0 Flash":     1_048_576,
+    "Claude 3.5 Sonnet":    200_000,
+    "Llama 3.1 70B":        128_000,
+    "Llama 3.1 405B":       128_000,
+    "Llama 3.3 70B":        128_000,
+    "OpenAI gpt-4o":        128_000
+}
+# Room kept free for the prompts around the document and for the answer
+RESERVED_TOKENS = 8192
+
+HTTP_KEEPALIVE_CONNECTIONS = 32
+
+@lru_cache(maxsize=1)
+def _litellm():
+    # litellm takes seconds to import, so it is loaded on the first model call
+    # rather than before the UI can start
+    import httpx
+    import litellm
+    # One keep-alive pool shared by every litellm call, so only the first request
+    # to each endpoint pays for the TCP and TLS handshakes
+    litellm.client_session = httpx.Client(
+        limits=httpx.Limits(max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS),
+        timeout=httpx.Timeout(600.0, connect=10.0)
+    )
+    return litellm
+
+def check_document_size(model_name: str, document_content: str = None) -> int:
+    """
+    Reject a document that cannot fit in the model's context window
+    
+    Runs before any model call, so an oversized upload fails immediately
+    instead of after a provider round-trip.
+    
+    Args:
+        model_name: Name of the model to use
+        document_content: Extracted document text
+        
+    Returns:
+        Token count of the document, or 0 when it was not counted
+        
+    Raises:
+        ValueError: If the document exceeds the model's budget
+    """
+    budget = MODEL_CONTEXT_TOKENS.get(model_name, 0) - RESERVED_TOKENS
+    # Every token covers at least one character, so short documents need no counting
+    if not document_content or budget <= 0 or len(document_content) <= budget:
+        return 0
+    
+    tokens = _litellm().token_counter(model=AVAILABLE_MODELS[model_name][1], text=document_content)
+    if tokens > budget:
+        raise ValueError(
+            f"The document is about {tokens:,} tokens, more than {model_name} can take "
+            f"({budget:,} after leaving room for the question and answer)"
+        )
+    return tokens
+
+@lru_cache(maxsize=None)
+def get_api_key(model_id: str) -> str:
+    """
+    Look up the API key for a model from the environment
+
+    Keys are read from LLM_KEY_<MODEL_ID>, e.g. azure_ai/gpt-4o is read from
+    LLM_KEY_AZURE_AI_GPT_4O, and cached after the first lookup.
+
+    Args:
+        model_id: litellm model identifier
+
+    Returns:
+        The API key
+    """
+    env_var = "LLM_KEY_" + re.sub(r"[^0-9A-Za-z]", "_", model_id).upper()
+    try:
+        return os.environ[env_var]
+    except KeyError:
+        raise KeyError(f"API key for {model_id} not set; export {env_var}") from None
+
+def _completion_args(model_name: str, prompt: str, cached_prefix: str = None) -> dict:
+    """Build the litellm completion() arguments for the selected model"""
+    if model_name not in AVAILABLE_MODELS:
+        raise ValueError(f"Unknown model: {model_name}")
+
+    model_provider, model_id, location_or_base = AVAILABLE_MODELS[model_name]
+    content = prompt
+    # Claude only reuses a prompt prefix it was explicitly told to cache; the
+    # other providers cache long shared prefixes on their own
+    if cached_prefix and "claude" in model_id and prompt.startswith(cached_prefix):
+        content = [
+            {"type": "text", "text": cached_prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": prompt[len(cached_prefix):]}
+        ]
+    args = {"model": model_id, "messages": [{"content": content, "role": "user"}]}
+
+    if model_provider == "vertex_ai":
+        args["vertex_location"] = location_or_base
+    elif model_provider == "azure_ai":
+        args["api_key"] = get_api_key(model_id)
+        args["api_base"] = location_or_base
+    else:
+        raise ValueError(f"Unknown provider: {model_provider}")
+
+    return args
+
+def get_model_response(model_name: str, prompt: str, cached_prefix: str = None) -> str:
     """
     Helper function to get response from selected model
     
     Args:
         model_name: Name of the model to use
         prompt: Input prompt
+        cached_prefix: Optional leading part of the prompt shared with other calls,
+            which providers that need a hint are asked to cache
         
     Returns:
         Generated text response
     """
     try:
-        if model_name not in AVAILABLE_MODELS:
-            raise ValueError(f"Unknown model: {model_name}")
-            
-        model_provider, model_id, location_or_base = AVAILABLE_MODELS[model_name]
-        
-        if model_provider == "vertex_ai":
-            response = completion(
-                model=model_id,
-                messages=[{"content": prompt, "role": "user"}],
-                vertex_location=location_or_base
-            )
-        elif model_provider == "azure_ai":
-            response = completion(
-                model=model_id,
-                messages=[{"content": prompt, "role": "user"}],
-                api_key=LLM_API_KEYS[model_id],
-                api_base=location_or_base
-            )
-        else:
-            raise ValueError(f"Unknown provider: {model_provider}")
-            
+        response = _litellm().completion(**_completion_args(model_name, prompt, cached_prefix))
         return response.choices[0].message.content
         
     except Exception as e:
         return f"Error with {model_name}: {str(e)}"
 
+def is_error_response(model_name: str, text: str) -> bool:
+    """
+    Check whether text is an error message from get_model_response
+    
+    get_model_response reports failures as text rather than raising, so
+    callers use this to avoid caching or reusing them as answers.
+    
+    Args:
+        model_name: Name of the model that was called
+        text: Response text
+        
+    Returns:
+        True if the text is an error message
+    """
+    return isinstance(text, str) and text.startswith(f"Error with {model_name}:")
+
+# Shared across requests so repeated prompts skip the model call; persisted to
+# disk so restarts do not pay for the same prompts again. Exact matches only:
+# each CoT stage feeds the next, so a stage reused from a similar question
+# would carry that question's reasoning into the new answer.
+model_response_cache = ResponseCache(embed=None, db_path="llm_cache.db")
+# Concurrent identical requests share one model call
+inflight_requests = InflightRequests()
+
+def cached_model_response(model_name: str, prompt: str, cached_prefix: str = None,
+                          use_cache: bool = True) -> str:
+    """
+    get_model_response with a response cache in front of it
+
+    Only identical prompts to the same model are served from the cache.
+
+    Args:
+        model_name: Name of the model to use
+        prompt: Input prompt
+        cached_prefix: Optional leading part of the prompt to mark for provider-side caching
+        use_cache: Whether cached answers may be served at all; the new answer
+            is stored either way
+
+    Returns:
+        Generated text response
+    """
+    cache_key = make_key(model_name, prompt)
+    if use_cache:
+        cached = model_response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        response = inflight_requests.run(cache_key, get_model_response, model_name, prompt, cached_prefix)
+    else:
+        response = get_model_response(model_name, prompt, cached_prefix)
+    if response and not is_error_response(model_name, response):
+        model_response_cache.set(cache_key, response)
+    return response
+
+def stream_model_response(model_name: str, prompt: str, cached_prefix: str = None,
+                          use_cache: bool = True) -> Iterator[str]:
+    """
+    Streaming counterpart of cached_model_response
+
+    Yields the text generated so far each time the provider sends a chunk.
+    A cached answer is yielded once, and a completed answer is cached.
+
+    Args:
+        model_name: Name of the model to use
+        prompt: Input prompt
+        cached_prefix: Optional leading part of the prompt to mark for provider-side caching
+        use_cache: Whether cached answers may be served at all; the new answer
+            is stored either way
+
+    Yields:
+        Generated text so far
+    """
+    cache_key = make_key(model_name, prompt)
+    if use_cache:
+        cached = model_response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    text = ""
+    try:
+        for chunk in _litellm().completion(stream=True, **_completion_args(model_name, prompt, cached_prefix)):
+            delta = chunk.choices[0].delta.content
+            if delta:
+                text += delta
+                yield text
+    except Exception as e:
+        yield f"Error with {model_name}: {str(e)}"
+        return
+
+    if text:
+        model_response_cache.set(cache_key, text)
+
+def document_prefix(system_prompt: str, document_content: str = None) -> str:
+    """
+    Build the leading part shared by the initial-response and thinking prompts
+    
+    Keeping the system prompt and document first, and identical, lets the
+    provider serve this prefix from its prompt cache on the second call.
+    
+    Args:
+        system_prompt: System context prompt
+        document_content: Optional document content
+        
+    Returns:
+        The prompt prefix
+    """
+    # The document can be megabytes; join copies it once
+    if not document_content:
+        return system_prompt + "\n\n"
+    return "".join([system_prompt, "\n\nDocument Content:\n", document_content, "\n\n"])
+
+def _thinking_prompt(prefix: str, cot_prompt: str, question: str) -> str:
+    return "".join([prefix, cot_prompt, "\n\nQuestion: ", question, "\n\nThinking:"])
+
+def build_initial_response_prompt(prefix: str, question: str) -> str:
+    """
+    Build the prompt for a concise answer without chain-of-thought reasoning
+    
+    Args:
+        prefix: Output of document_prefix, built once per request and shared
+            with the thinking prompt
+        question: User question
+        
+    Returns:
+        The prompt text
+    """
+    return "".join([prefix, "Question: ", question,
+                    "\n\nProvide a concise answer to this question without any explanation or reasoning."])
+
+def _reflection_prompt(system_prompt: str, thinking_response: str) -> str:
+    return (
+        f"{system_prompt}\n\nInitial thinking: {thinking_response}\n\n"
+        "Reflect on this thinking process. What are the key assumptions? "
+        "Are there any logical gaps or potential biases? How can the reasoning be improved?"
+    )
+
+def _final_prompt(system_prompt: str, question: str, thinking_response: str, reflection: str) -> str:
+    return (
+        f"{system_prompt}\n\nQuestion: {question}\n\n"
+        f"Initial thinking: {thinking_response}\n\n"
+        f"Reflection: {reflection}\n\n"
+        "Based on this reflection, provide an improved final answer:"
+    )
+
 def cot_reflection(
     system_prompt: str,
     cot_prompt: str,
     question: str,
     document_content: str = None,
-    model_name: str = "Gemini 2.0 Flash"
+    model_name: str = "Gemini 2.0 Flash",
+    use_cache: bool = True
 ) -> tuple[str, str, str]:
     """
     Perform chain-of-thought reflection using the specified model
@@ -70,45 +299,88 @@ def cot_reflection(
         question: User question
         document_content: Optional document content
         model_name: Name of model to use
+        use_cache: Whether cached answers may be served; new answers are stored either way
         
     Returns:
         Tuple of (thinking, reflection, output)
     """
     try:
-        # Format the prompts
-        doc_content = f"Document Content:\n{document_content}\n\n" if document_content else ""
-        thinking_prompt = f"{system_prompt}\n\n{doc_content}{cot_prompt}\n\nQuestion: {question}\n\nThinking:"
-        
         # Get thinking response using selected model
-        thinking_response = get_model_response(model_name, thinking_prompt)
-        thinking = f"<thinking>{thinking_response}</thinking>"
-        
-        # Format reflection prompt
-        reflection_prompt = (
-            f"{system_prompt}\n\nInitial thinking: {thinking_response}\n\n"
-            "Reflect on this thinking process. What are the key assumptions? "
-            "Are there any logical gaps or potential biases? How can the reasoning be improved?"
+        prefix = document_prefix(system_prompt, document_content)
+        thinking_response = cached_model_response(
+            model_name, _thinking_prompt(prefix, cot_prompt, question),
+            cached_prefix=prefix, use_cache=use_cache
         )
+        thinking = f"<thinking>{thinking_response}</thinking>"
         
         # Get reflection using selected model
-        reflection = get_model_response(model_name, reflection_prompt)
-        
-        # Format final output prompt
-        final_prompt = (
-            f"{system_prompt}\n\nQuestion: {question}\n\n"
-            f"Initial thinking: {thinking_response}\n\n"
-            f"Reflection: {reflection}\n\n"
-            "Based on this reflection, provide an improved final answer:"
+        reflection = cached_model_response(
+            model_name, _reflection_prompt(system_prompt, thinking_response), use_cache=use_cache
         )
         
         # Get final output using selected model
-        output = get_model_response(model_name, final_prompt)
+        output = cached_model_response(
+            model_name, _final_prompt(system_prompt, question, thinking_response, reflection),
+            use_cache=use_cache
+        )
         
         return thinking, reflection, output
         
     except Exception as e:
         return f"Error: {str(e)}", "", ""
 
+def stream_cot_reflection(
+    system_prompt: str,
+    cot_prompt: str,
+    question: str,
+    document_content: str = None,
+    model_name: str = "Gemini 2.0 Flash",
+    use_cache: bool = True
+) -> Iterator[tuple[str, str, str]]:
+    """
+    Streaming variant of cot_reflection
+    
+    Each stage streams into its own section while the previous sections
+    stay in place; the last tuple yielded is what cot_reflection returns.
+    
+    Args:
+        system_prompt: System context prompt
+        cot_prompt: Chain of thought prompt
+        question: User question
+        document_content: Optional document content
+        model_name: Name of model to use
+        use_cache: Whether cached answers may be served; new answers are stored either way
+        
+    Yields:
+        Tuple of (thinking, reflection, output) so far
+    """
+    prefix = document_prefix(system_prompt, document_content)
+    thinking_response = ""
+    for thinking_response in stream_model_response(
+        model_name, _thinking_prompt(prefix, cot_prompt, question),
+        cached_prefix=prefix, use_cache=use_cache
+    ):
+        yield f"<thinking>{thinking_response}</thinking>", "", ""
+    thinking = f"<thinking>{thinking_response}</thinking>"
+    
+    reflection = ""
+    for reflection in stream_model_response(
+        model_name, _reflection_prompt(system_prompt, thinking_response), use_cache=use_cache
+    ):
+        yield thinking, reflection, ""
+    
+    output, streamed = "", False
+    for output in stream_model_response(
+        model_name, _final_prompt(system_prompt, question, thinking_response, reflection),
+        use_cache=use_cache
+    ):
+        streamed = True
+        yield thinking, reflection, output
+    # An empty final answer streams nothing; still yield the result so callers
+    # always receive at least one tuple
+    if not streamed:
+        yield thinking, reflection, output
+
 # Default prompts
 system_prompt = """You are a helpful AI assistant. When answering questions, think carefully and break down your reasoning step by step."""
 
@@ -1,14 +1,23 @@
 import gradio as gr
-import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from cot_reflection_file import (
-    cot_reflection, 
+    stream_cot_reflection,
     cot_prompt as default_cot_prompt, 
     system_prompt as default_system_prompt,
-    get_model_response,
+    cached_model_response,
+    build_initial_response_prompt,
+    document_prefix,
+    check_document_size,
     AVAILABLE_MODELS
 )
 from document_utils import read_document
+from ui_utils import build_header, build_output_row
+
+# Runs the initial-response call alongside the CoT chain
+executor = ThreadPoolExecutor(max_workers=8)
+
+_THINKING_RE = re.compile(r'<thinking>(.*?)</thinking>', re.DOTALL)
 
 def process_question(file, user_prompt, system_prompt, cot_prompt, selected_model):
     try:
@@ -16,24 +25,38 @@ def process_question(file, user_prompt, system_prompt, cot_prompt, selected_mode
         document_content = None
         if file is not None:
             document_content = read_document(file.name)
+            check_document_size(selected_model, document_content)
 
-        # Get thinking, reflection, and output from cot_reflection
-        thinking, reflection, output = cot_reflection(
+        # The initial response does not depend on the CoT chain, so run both at once
+        prefix = document_prefix(system_prompt, document_content)
+        initial_future = executor.submit(
+            cached_model_response,
+            selected_model, build_initial_response_prompt(prefix, user_prompt),
+            cached_prefix=prefix
+        )
+
+        # Stream thinking, reflection, and output from cot_reflection as they arrive
+        initial_response, actual_thinking, reflection, output = "", "", "", ""
+        for thinking, reflection, output in stream_cot_reflection(
             system_prompt=system_prompt,
             cot_prompt=cot_prompt,
             question=user_prompt,
             document_content=document_content,
             model_name=selected_model
-        )
+        ):
+            if not initial_response and initial_future.done():
+                initial_response = initial_future.result()
 
-        # Extract the actual thinking content
-        thinking_match = re.search(r'<thinking>(.*?)</thinking>', thinking, re.DOTALL)
-        actual_thinking = thinking_match.group(1).strip() if thinking_match else thinking
+            # Extract the actual thinking content
+            thinking_match = _THINKING_RE.search(thinking)
+            actual_thinking = thinking_match.group(1).strip() if thinking_match else thinking
 
-        # Get the initial response
-        doc_content = f"Document Content:\n{document_content}\n\n" if document_content else ""
-        initial_response_prompt = f"{system_prompt}\n\n{doc_content}Question: {user_prompt}\n\nProvide a concise answer to this question without any explanation or reasoning."
-        initial_response = get_model_response(selected_model, initial_response_prompt)
+            # Prompt boxes are only re-sent with the final result
+            yield user_prompt, initial_response, actual_thinking, reflection, output, gr.update(), gr.update()
+
+        initial_response = initial_future.result()
+        if not (actual_thinking or reflection or output):
+            raise ValueError(f"{selected_model} returned an empty response")
 
         # Provide default messages for empty sections
         initial_response = initial_response if initial_response else "No initial response provided."
@@ -41,25 +64,13 @@ def process_question(file, user_prompt, system_prompt, cot_prompt, selected_mode
         reflection = reflection if reflection else "No reflection process provided."
         output = output if output else "No final output provided."
 
-        return user_prompt, initial_response, actual_thinking, reflection, output, system_prompt, cot_prompt
+        yield user_prompt, initial_response, actual_thinking, reflection, output, system_prompt, cot_prompt
     except Exception as e:
-        return user_prompt, f"An error occurred: {str(e)}", "", "", "", system_prompt, cot_prompt
-
-# Get the absolute path to the logo file
-current_dir = os.path.dirname(os.path.abspath(__file__))
-logo_path = os.path.join(current_dir, "images", "Linklaters.svg.png")
+        yield user_prompt, f"An error occurred: {str(e)}", "", "", "", system_prompt, cot_prompt
 
 # Gradio interface
 with gr.Blocks() as iface:
-    with gr.Column(scale=1):
-        gr.Image(logo_path, show_label=False, height=70)
-    
-    gr.Markdown("<br><br>")
-    
-    gr.Markdown("""
-    <h1 style='text-align: center; margin-bottom: 0;'>Document Analysis with Chain of Thought Reflection</h1>
-    <p style='text-align: center; font-style: italic; margin-top: 5px; font-size: 1.2em;'>powered by Linklaters GenAI Platform</p>
-    """)
+    build_header("Document Analysis with Chain of Thought Reflection")
     
     with gr.Row():
         with gr.Column():
@@ -93,12 +104,7 @@ with gr.Blocks() as iface:
                     )
             submit_btn = gr.Button("Submit")
     
-    with gr.Row():
-        user_prompt_output = gr.Textbox(label="1. User Prompt")
-        initial_response_output = gr.Textbox(label="2. Initial Response")
-        thinking_output = gr.Textbox(label="3. Thinking")
-        reflection_output = gr.Textbox(label="4. Reflection")
-        final_output = gr.Textbox(label="5. Final Output")
+    user_prompt_output, initial_response_output, thinking_output, reflection_output, final_output = build_output_row()
     
     submit_btn.click(
         fn=process_question,
@@ -107,4 +113,7 @@ with gr.Blocks() as iface:
     )
 
 if __name__ == "__main__":
-    iface.launch(share=False)
\ No newline at end of file
+    # Handlers run in Gradio's worker threads and spend nearly all their time
+    # waiting on model I/O, so allow far more of them than CPU-bound work would
+    iface.queue(default_concurrency_limit=48, max_size=64, api_open=False)
+    iface.launch(share=False, max_threads=64)
\ No newline at end of file
@@ -6,6 +6,10 @@ from reflection_gemini import query_gemini_pro
 
 logger = logging.getLogger(__name__)
 
+_THINKING_RE = re.compile(r'<thinking>(.*?)</thinking>', re.DOTALL)
+_REFLECTION_RE = re.compile(r'<reflection>(.*?)</reflection>', re.DOTALL)
+_OUTPUT_RE = re.compile(r'<output>(.*?)(?:</output>|$)', re.DOTALL)
+
 system_prompt = """You are a legal assistant. Provide a detailed and accurate answer to the following question."""
 
 cot_prompt = """You are an AI assistant that uses a Chain of Thought (CoT) approach with reflection to answer queries. Follow these steps:
@@ -55,9 +59,9 @@ def cot_reflection(system_prompt, cot_prompt, question):
     logger.info(f"CoT with Reflection :\n{full_response}")
 
     # Extract thinking, reflection, and output
-    thinking_match = re.search(r'<thinking>(.*?)</thinking>', full_response, re.DOTALL)
-    reflection_match = re.search(r'<reflection>(.*?)</reflection>', full_response, re.DOTALL)
-    output_match = re.search(r'<output>(.*?)(?:</output>|$)', full_response, re.DOTALL)
+    thinking_match = _THINKING_RE.search(full_response)
+    reflection_match = _REFLECTION_RE.search(full_response)
+    output_match = _OUTPUT_RE.search(full_response)
 
     thinking = thinking_match.group(1).strip() if thinking_match else "No thinking process provided."
     reflection = reflection_match.group(1).strip() if reflection_match else "No reflection process provided."
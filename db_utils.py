@@ -1,10 +1,17 @@
 import sqlite3
 import json
+import threading
 from datetime import datetime
 from functools import wraps
-from typing import Dict, List, Tuple, Optional, Any
+from operator import itemgetter
+from typing import Dict, Iterable, List, Tuple, Optional, Any
 from dataclasses import dataclass
 
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib encoder produces the same JSON, only slower
+    orjson = None
+
 def safe_db_operation(operation):
     @wraps(operation)
     def wrapper(*args, **kwargs):
@@ -16,6 +23,96 @@ def safe_db_operation(operation):
             return f"Unexpected error: {str(e)}"
     return wrapper
 
+# Statements are kept as constants and run on one long-lived connection,
+# so sqlite3's per-connection statement cache parses each of them only once
+CREATE_SNAPSHOTS_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS snapshots
+                                (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                 snapshot_name TEXT NOT NULL,
+                                 user_prompt TEXT NOT NULL,
+                                 system_prompt TEXT,
+                                 model_name TEXT NOT NULL,
+                                 cot_prompt TEXT,
+                                 initial_response TEXT,
+                                 thinking TEXT,
+                                 reflection TEXT,
+                                 final_response TEXT,
+                                 created_at TIMESTAMP,
+                                 tags TEXT)'''
+# WAL commits append to a log instead of rewriting the database, so a save
+# costs no fsync under synchronous=NORMAL and readers never wait on it.
+# Reads go through a 256 MiB memory map and a 64 MiB page cache, so browsing
+# the table is served from memory rather than read() calls.
+CONNECTION_PRAGMAS_SQL = '''PRAGMA journal_mode=WAL;
+                            PRAGMA synchronous=NORMAL;
+                            PRAGMA temp_store=MEMORY;
+                            PRAGMA mmap_size=268435456;
+                            PRAGMA cache_size=-65536;'''
+CREATE_CREATED_AT_INDEX_SQL = 'CREATE INDEX IF NOT EXISTS idx_snapshots_created_at ON snapshots (created_at)'
+# Full-text index over the searchable columns. The trigram tokenizer matches
+# any substring of at least three characters, the same hits as LIKE '%term%',
+# but from an index instead of scanning every row.
+FTS_MIN_TERM_LENGTH = 3
+FTS_TABLE_EXISTS_SQL = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'snapshots_fts'"
+CREATE_FTS_SQL = '''CREATE VIRTUAL TABLE IF NOT EXISTS snapshots_fts
+                    USING fts5(snapshot_name, user_prompt, tags,
+                               content='snapshots', content_rowid='id', tokenize='trigram');
+                    CREATE TRIGGER IF NOT EXISTS snapshots_fts_insert AFTER INSERT ON snapshots BEGIN
+                        INSERT INTO snapshots_fts(rowid, snapshot_name, user_prompt, tags)
+                        VALUES (new.id, new.snapshot_name, new.user_prompt, new.tags);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS snapshots_fts_delete AFTER DELETE ON snapshots BEGIN
+                        INSERT INTO snapshots_fts(snapshots_fts, rowid, snapshot_name, user_prompt, tags)
+                        VALUES ('delete', old.id, old.snapshot_name, old.user_prompt, old.tags);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS snapshots_fts_update AFTER UPDATE ON snapshots BEGIN
+                        INSERT INTO snapshots_fts(snapshots_fts, rowid, snapshot_name, user_prompt, tags)
+                        VALUES ('delete', old.id, old.snapshot_name, old.user_prompt, old.tags);
+                        INSERT INTO snapshots_fts(rowid, snapshot_name, user_prompt, tags)
+                        VALUES (new.id, new.snapshot_name, new.user_prompt, new.tags);
+                    END;'''
+REBUILD_FTS_SQL = "INSERT INTO snapshots_fts(snapshots_fts) VALUES ('rebuild')"
+INSERT_SNAPSHOT_SQL = '''INSERT INTO snapshots
+                         (snapshot_name, user_prompt, system_prompt, model_name, 
+                          cot_prompt, initial_response, thinking, reflection, 
+                          final_response, created_at, tags)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+SEARCH_SNAPSHOTS_SQL = '''SELECT * FROM snapshots 
+                          WHERE snapshot_name LIKE ? 
+                          OR user_prompt LIKE ? 
+                          OR tags LIKE ?
+                          ORDER BY created_at DESC
+                          LIMIT ? OFFSET ?'''
+MATCH_SNAPSHOTS_SQL = '''SELECT * FROM snapshots
+                         WHERE id IN (SELECT rowid FROM snapshots_fts WHERE snapshots_fts MATCH ?)
+                         ORDER BY created_at DESC
+                         LIMIT ? OFFSET ?'''
+ALL_SNAPSHOTS_SQL = 'SELECT * FROM snapshots ORDER BY created_at DESC LIMIT ? OFFSET ?'
+# The snapshots table shows only these columns, in this order
+SNAPSHOT_SUMMARY_COLUMNS = 'id, snapshot_name, created_at, model_name, user_prompt, tags'
+# The same columns picked from a full snapshots row, e.g. one from insert_snapshot
+TABLE_COLUMNS = itemgetter(0, 1, 10, 4, 2, 11)
+SEARCH_SNAPSHOT_SUMMARIES_SQL = SEARCH_SNAPSHOTS_SQL.replace('*', SNAPSHOT_SUMMARY_COLUMNS, 1)
+MATCH_SNAPSHOT_SUMMARIES_SQL = MATCH_SNAPSHOTS_SQL.replace('*', SNAPSHOT_SUMMARY_COLUMNS, 1)
+ALL_SNAPSHOT_SUMMARIES_SQL = ALL_SNAPSHOTS_SQL.replace('*', SNAPSHOT_SUMMARY_COLUMNS, 1)
+COUNT_SEARCH_SNAPSHOTS_SQL = '''SELECT COUNT(*) FROM snapshots
+                                WHERE snapshot_name LIKE ? OR user_prompt LIKE ? OR tags LIKE ?'''
+COUNT_MATCH_SNAPSHOTS_SQL = 'SELECT COUNT(*) FROM snapshots_fts WHERE snapshots_fts MATCH ?'
+# Keys of an exported snapshot, in snapshots column order
+EXPORT_KEYS = ('id', 'name', 'user_prompt', 'system_prompt', 'model_name', 'cot_prompt',
+               'initial_response', 'thinking', 'reflection', 'final_response', 'created_at', 'tags')
+COUNT_SNAPSHOTS_SQL = 'SELECT COUNT(*) FROM snapshots'
+# Statement for each way a search term can be served: no term, LIKE, FTS5
+SNAPSHOT_QUERIES = {'all': ALL_SNAPSHOTS_SQL, 'like': SEARCH_SNAPSHOTS_SQL, 'match': MATCH_SNAPSHOTS_SQL}
+SNAPSHOT_SUMMARY_QUERIES = {'all': ALL_SNAPSHOT_SUMMARIES_SQL, 'like': SEARCH_SNAPSHOT_SUMMARIES_SQL,
+                            'match': MATCH_SNAPSHOT_SUMMARIES_SQL}
+SNAPSHOT_COUNT_QUERIES = {'all': COUNT_SNAPSHOTS_SQL, 'like': COUNT_SEARCH_SNAPSHOTS_SQL,
+                          'match': COUNT_MATCH_SNAPSHOTS_SQL}
+# Everything but the id, which the caller already has
+SNAPSHOT_BY_ID_SQL = '''SELECT snapshot_name, user_prompt, system_prompt, model_name, cot_prompt,
+                               initial_response, thinking, reflection, final_response, created_at, tags
+                        FROM snapshots WHERE id = ?'''
+DELETE_SNAPSHOT_SQL = 'DELETE FROM snapshots WHERE id = ?'
+
 @dataclass
 class SnapshotData:
     """Data model for snapshot information."""
@@ -53,26 +150,35 @@ class SnapshotData:
 class SnapshotDB:
     def __init__(self, db_path: str = 'prompts_snapshots.db'):
         self.db_path = db_path
+        # One connection for the app's lifetime instead of one per query;
+        # Gradio calls in from worker threads, so access is serialised
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._conn.executescript(CONNECTION_PRAGMAS_SQL)
         self.init_db()
+        self._fts = self._init_fts()
 
     @safe_db_operation
     def init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._lock, self._conn as conn:
             c = conn.cursor()
-            c.execute('''CREATE TABLE IF NOT EXISTS snapshots
-                        (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                         snapshot_name TEXT NOT NULL,
-                         user_prompt TEXT NOT NULL,
-                         system_prompt TEXT,
-                         model_name TEXT NOT NULL,
-                         cot_prompt TEXT,
-                         initial_response TEXT,
-                         thinking TEXT,
-                         reflection TEXT,
-                         final_response TEXT,
-                         created_at TIMESTAMP,
-                         tags TEXT)''')
-            conn.commit()
+            c.execute(CREATE_SNAPSHOTS_TABLE_SQL)
+            c.execute(CREATE_CREATED_AT_INDEX_SQL)
+
+    def _init_fts(self) -> bool:
+        """Create the full-text search index, returning False if SQLite lacks FTS5."""
+        try:
+            with self._lock:
+                created = self._conn.execute(FTS_TABLE_EXISTS_SQL).fetchone() is None
+                self._conn.executescript(CREATE_FTS_SQL)
+                # Index snapshots saved before the index existed
+                if created:
+                    with self._conn:
+                        self._conn.execute(REBUILD_FTS_SQL)
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable, falling back to LIKE: {e}")
+            return False
 
     @safe_db_operation
     def save_snapshot(self, snapshot_data: Dict) -> str:
@@ -86,46 +192,101 @@ class SnapshotDB:
             Status message
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                c = conn.cursor()
-                c.execute('''INSERT INTO snapshots
-                            (snapshot_name, user_prompt, system_prompt, model_name, 
-                             cot_prompt, initial_response, thinking, reflection, 
-                             final_response, created_at, tags)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                         (snapshot_data['snapshot_name'],
-                          snapshot_data['user_prompt'],
-                          snapshot_data['system_prompt'],
-                          snapshot_data['model_name'],
-                          snapshot_data['cot_prompt'],
-                          snapshot_data['initial_response'],
-                          snapshot_data['thinking'],
-                          snapshot_data['reflection'],
-                          snapshot_data['final_response'],
-                          datetime.now(),
-                          snapshot_data.get('tags', '')))
-                conn.commit()
-                return "✓ Snapshot saved successfully"
+            self.insert_snapshot(snapshot_data)
+            return "✓ Snapshot saved successfully"
         except sqlite3.Error as e:
             return f"Database error: {str(e)}"
         except Exception as e:
             return f"Error: {str(e)}"
 
-    @safe_db_operation
-    def get_snapshots(self, search_term: str = None) -> List[Tuple]:
-        with sqlite3.connect(self.db_path) as conn:
+    def insert_snapshot(self, snapshot_data: Dict) -> Tuple:
+        """
+        Insert a snapshot and return it as stored.
+        
+        Args:
+            snapshot_data: Dictionary containing snapshot data
+            
+        Returns:
+            The new row, in the same column order as get_snapshots
+            
+        Raises:
+            sqlite3.Error: If the insert fails
+        """
+        row = (snapshot_data['snapshot_name'],
+               snapshot_data['user_prompt'],
+               snapshot_data['system_prompt'],
+               snapshot_data['model_name'],
+               snapshot_data['cot_prompt'],
+               snapshot_data['initial_response'],
+               snapshot_data['thinking'],
+               snapshot_data['reflection'],
+               snapshot_data['final_response'],
+               datetime.now(),
+               snapshot_data.get('tags', ''))
+        with self._lock, self._conn as conn:
             c = conn.cursor()
-            if search_term:
-                query = '''SELECT * FROM snapshots 
-                          WHERE snapshot_name LIKE ? 
-                          OR user_prompt LIKE ? 
-                          OR tags LIKE ?
-                          ORDER BY created_at DESC'''
-                search_pattern = f'%{search_term}%'
-                c.execute(query, (search_pattern, search_pattern, search_pattern))
-            else:
-                c.execute('SELECT * FROM snapshots ORDER BY created_at DESC')
-            return c.fetchall()
+            c.execute(INSERT_SNAPSHOT_SQL, row)
+            snapshot_id = c.lastrowid
+        # created_at reads back as text, the way sqlite3 stores datetimes
+        return (snapshot_id,) + row[:9] + (str(row[9]), row[10])
+
+    @safe_db_operation
+    def get_snapshots(self, search_term: str = None, limit: Optional[int] = None,
+                      offset: int = 0) -> List[Tuple]:
+        return self._query_snapshots(SNAPSHOT_QUERIES, search_term, limit, offset)
+
+    @safe_db_operation
+    def get_snapshot_summaries(self, search_term: str = None, limit: Optional[int] = None,
+                               offset: int = 0) -> List[Tuple]:
+        """
+        Retrieve snapshots projected to the columns shown in the snapshots table.
+        
+        The prompts and responses are never read, and rows come back in
+        display order, so they can be handed to the table as they are.
+        
+        Args:
+            search_term: Optional text to match in the name, prompt or tags
+            limit: Maximum number of rows, newest first; None for all
+            offset: Number of matching rows to skip, for paging
+            
+        Returns:
+            List of (id, snapshot_name, created_at, model_name, user_prompt, tags) tuples
+        """
+        return self._query_snapshots(SNAPSHOT_SUMMARY_QUERIES, search_term, limit, offset)
+
+    def count_snapshots(self, search_term: str = None) -> int:
+        """
+        Count the snapshots get_snapshots would return without a limit.
+        
+        Args:
+            search_term: Optional text to match in the name, prompt or tags
+            
+        Returns:
+            Number of matching snapshots
+            
+        Raises:
+            sqlite3.Error: If the query fails
+        """
+        kind, params = self._search_params(search_term)
+        with self._lock:
+            return self._conn.execute(SNAPSHOT_COUNT_QUERIES[kind], params).fetchone()[0]
+
+    def _search_params(self, search_term: Optional[str]) -> Tuple[str, tuple]:
+        if search_term and self._fts and len(search_term) >= FTS_MIN_TERM_LENGTH:
+            # Quoted as a single phrase so FTS5 query syntax in the term is taken literally
+            return 'match', ('"' + search_term.replace('"', '""') + '"',)
+        if search_term:
+            search_pattern = f'%{search_term}%'
+            return 'like', (search_pattern, search_pattern, search_pattern)
+        return 'all', ()
+
+    def _query_snapshots(self, queries: Dict[str, str], search_term: Optional[str],
+                         limit: Optional[int], offset: int) -> List[Tuple]:
+        kind, params = self._search_params(search_term)
+        # SQLite treats a negative LIMIT as no limit
+        limit = -1 if limit is None else limit
+        with self._lock:
+            return self._conn.execute(queries[kind], params + (limit, offset)).fetchall()
 
     @safe_db_operation
     def get_snapshot_by_id(self, snapshot_id: int) -> Optional[Dict[str, Any]]:
@@ -139,28 +300,18 @@ class SnapshotDB:
             Dictionary containing snapshot data if found, None otherwise
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                c = conn.cursor()
-                c.execute('SELECT * FROM snapshots WHERE id = ?', (snapshot_id,))
+            with self._lock:
+                c = self._conn.cursor()
+                # Named columns for this lookup only; table queries keep plain tuples
+                c.row_factory = sqlite3.Row
+                c.execute(SNAPSHOT_BY_ID_SQL, (snapshot_id,))
                 snapshot = c.fetchone()
                 
                 if not snapshot:
                     return None
                 
                 # Convert snapshot data to dictionary
-                return {
-                    "snapshot_name": snapshot[1],
-                    "user_prompt": snapshot[2],
-                    "system_prompt": snapshot[3],
-                    "model_name": snapshot[4],
-                    "cot_prompt": snapshot[5],
-                    "initial_response": snapshot[6],
-                    "thinking": snapshot[7],
-                    "reflection": snapshot[8],
-                    "final_response": snapshot[9],
-                    "created_at": snapshot[10],
-                    "tags": snapshot[11]
-                }
+                return dict(snapshot)
                 
         except Exception as e:
             print(f"Database retrieval error: {e}")
@@ -170,36 +321,80 @@ class SnapshotDB:
     def delete_selected_snapshots(self, selected_rows: List[List]) -> Tuple[str, List[List]]:
         """Delete selected snapshots and return updated table data."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                c = conn.cursor()
-                for row in selected_rows:
-                    snapshot_id = row[0]  # First column is ID
-                    c.execute('DELETE FROM snapshots WHERE id = ?', (snapshot_id,))
-                conn.commit()
-                return "✓ Selected snapshots deleted successfully", self.get_snapshots()
+            self.delete_snapshots(row[0] for row in selected_rows)  # First column is ID
+            return "✓ Selected snapshots deleted successfully", self.get_snapshots()
         except Exception as e:
             return f"Error deleting snapshots: {str(e)}", self.get_snapshots()
 
+    def delete_snapshots(self, snapshot_ids: Iterable[int]) -> None:
+        """
+        Delete snapshots by ID.
+        
+        Args:
+            snapshot_ids: IDs of the snapshots to delete
+            
+        Raises:
+            sqlite3.Error: If the delete fails
+        """
+        with self._lock, self._conn as conn:
+            c = conn.cursor()
+            for snapshot_id in snapshot_ids:
+                c.execute(DELETE_SNAPSHOT_SQL, (snapshot_id,))
+
     @safe_db_operation
     def export_snapshots(self, format: str = 'json') -> str:
         snapshots = self.get_snapshots()
         if format == 'json':
-            snapshot_list = []
-            for s in snapshots:
-                snapshot_dict = {
-                    'id': s[0],
-                    'name': s[1],
-                    'user_prompt': s[2],
-                    'system_prompt': s[3],
-                    'model_name': s[4],
-                    'cot_prompt': s[5],
-                    'initial_response': s[6],
-                    'thinking': s[7],
-                    'reflection': s[8],
-                    'final_response': s[9],
-                    'created_at': str(s[10]),
-                    'tags': s[11]
-                }
-                snapshot_list.append(snapshot_dict)
-            return json.dumps(snapshot_list, indent=2)
-        return "Unsupported export format"
\ No newline at end of file
+            return _dumps_export([_export_dict(s) for s in snapshots])
+        return "Unsupported export format"
+
+    def export_snapshots_to_file(self, path: str, format: str = 'json') -> int:
+        """
+        Write every snapshot to a file without holding them all in memory.
+        
+        'json' writes the same document as export_snapshots, one row at a
+        time straight from the cursor; 'sqlite' copies the database pages
+        with SQLite's backup API.
+        
+        Args:
+            path: Destination file, overwritten if it exists
+            format: 'json' or 'sqlite'
+            
+        Returns:
+            Number of snapshots exported
+            
+        Raises:
+            ValueError: If the format is not supported
+            sqlite3.Error: If reading the database fails
+        """
+        with self._lock:
+            if format == 'sqlite':
+                dst = sqlite3.connect(path)
+                try:
+                    self._conn.backup(dst)
+                finally:
+                    dst.close()
+                return self._conn.execute(COUNT_SNAPSHOTS_SQL).fetchone()[0]
+            if format != 'json':
+                raise ValueError(f"Unsupported export format: {format}")
+            
+            count = 0
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('[')
+                for s in self._conn.execute(ALL_SNAPSHOTS_SQL, (-1, 0)):
+                    # Indent each object as it would be inside the exported list
+                    f.write(',\n  ' if count else '\n  ')
+                    f.write(_dumps_export(_export_dict(s)).replace('\n', '\n  '))
+                    count += 1
+                f.write('\n]' if count else ']')
+            return count
+
+def _dumps_export(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+def _export_dict(row: Tuple) -> Dict[str, Any]:
+    snapshot = dict(zip(EXPORT_KEYS, row))
+    snapshot['created_at'] = str(snapshot['created_at'])
+    return snapshot
\ No newline at end of file
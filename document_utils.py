@@ -1,28 +1,125 @@
-from docx import Document
-import PyPDF2
+import hashlib
+import io
 import os
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from functools import lru_cache
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P, _W_R, _W_T, _W_TAB, _W_BR, _W_CR = (_W_NS + tag for tag in ("p", "r", "t", "tab", "br", "cr"))
+
+# Extracted text of recently uploaded documents, keyed by content hash
+DOCUMENT_CACHE_SIZE = 64
+_document_cache: "OrderedDict[str, str]" = OrderedDict()
+# Content hash of recently seen files, keyed by (path, size, mtime)
+_digest_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_document_cache_lock = threading.Lock()
 
 def read_document(file_path: str) -> str:
     """Read content from either DOCX or PDF files."""
     file_extension = os.path.splitext(file_path)[1].lower()
     
     try:
-        if file_extension == '.docx':
-            return read_docx(file_path)
-        elif file_extension == '.pdf':
-            return read_pdf(file_path)
+        # Dispatch on the file's magic bytes, so a mislabelled upload goes
+        # straight to the parser that can read it
+        with open(file_path, 'rb') as file:
+            head = file.read(8)
+        if head.startswith(b'%PDF'):
+            reader = read_pdf
+        elif head.startswith(b'PK\x03\x04'):
+            reader = read_docx
         else:
-            raise ValueError(f"Unsupported file format: {file_extension}")
+            raise ValueError(f"Unsupported file format: {file_extension} is not a PDF or DOCX file")
+        
+        # Re-uploads of the same file get a new temp path, so key on content
+        key = reader.__name__ + ':' + file_digest(file_path)
+        with _document_cache_lock:
+            content = _document_cache.get(key)
+            if content is not None:
+                _document_cache.move_to_end(key)
+                return content
+        
+        # Parsed in the calling thread: a worker process would re-import the
+        # launching app, rebuilding its UI, database and caches in every worker
+        content = reader(file_path)
+        with _document_cache_lock:
+            _document_cache[key] = content
+            while len(_document_cache) > DOCUMENT_CACHE_SIZE:
+                _document_cache.popitem(last=False)
+        return content
     except Exception as e:
         raise Exception(f"Error reading document: {str(e)}")
 
+def file_digest(file_path: str) -> str:
+    """Return a BLAKE2b hash of the file contents."""
+    # Resubmitting the same upload reuses its temp path, so an unchanged
+    # path, size and mtime can skip reading the file again
+    stat = os.stat(file_path)
+    stat_key = (file_path, stat.st_size, stat.st_mtime_ns)
+    with _document_cache_lock:
+        cached = _digest_cache.get(stat_key)
+        if cached is not None:
+            _digest_cache.move_to_end(stat_key)
+            return cached
+    
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    hexdigest = digest.hexdigest()
+    
+    with _document_cache_lock:
+        _digest_cache[stat_key] = hexdigest
+        while len(_digest_cache) > DOCUMENT_CACHE_SIZE:
+            _digest_cache.popitem(last=False)
+    return hexdigest
+
 def read_docx(file_path: str) -> str:
     """Read content from DOCX file."""
-    doc = Document(file_path)
-    return '\n'.join(paragraph.text for paragraph in doc.paragraphs)
+    # Stream word/document.xml instead of building python-docx's object model;
+    # only text, tabs and line breaks are kept, one line per paragraph.
+    # Tabs and breaks count only inside a run (w:r): w:tab also appears under
+    # w:pPr/w:tabs as a tab-stop definition, which is not text.
+    paragraphs, runs = [], []
+    run_depth = 0
+    with zipfile.ZipFile(file_path) as docx, docx.open('word/document.xml') as xml:
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            tag = elem.tag
+            if tag == _W_R:
+                run_depth += 1 if event == "start" else -1
+            elif event == "start":
+                continue
+            elif tag == _W_T:
+                if elem.text:
+                    runs.append(elem.text)
+            elif tag == _W_TAB:
+                if run_depth:
+                    runs.append('\t')
+            elif tag == _W_BR or tag == _W_CR:
+                if run_depth:
+                    runs.append('\n')
+            elif tag == _W_P:
+                paragraphs.append(''.join(runs))
+                runs.clear()
+                elem.clear()
+    return '\n'.join(paragraphs)
+
+@lru_cache(maxsize=1)
+def _pdf_backend():
+    # PyMuPDF is only loaded once a PDF is actually uploaded
+    import fitz
+    return fitz
 
 def read_pdf(file_path: str) -> str:
     """Read content from PDF file."""
-    with open(file_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        return '\n'.join(page.extract_text() for page in pdf_reader.pages) 
\ No newline at end of file
+    # PyMuPDF extracts text in C; "text" mode avoids building block/dict structures.
+    # Pages are appended to one buffer as they are read, instead of being
+    # collected for a join, so only one page's text is held alongside it.
+    with _pdf_backend().open(file_path) as doc, io.StringIO() as buf:
+        for page_number in range(doc.page_count):
+            if page_number:
+                buf.write('\n')
+            buf.write(doc.load_page(page_number).get_text("text"))
+        return buf.getvalue()
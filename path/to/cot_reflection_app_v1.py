@@ -2,62 +2,79 @@ import gradio as gr
 import os
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from cot_reflection_file import (
-    cot_reflection, 
+    stream_cot_reflection, 
     cot_prompt as default_cot_prompt, 
     system_prompt as default_system_prompt,
     get_model_response,
+    build_initial_response_prompt,
+    document_prefix,
+    check_document_size,
     AVAILABLE_MODELS
 )
 from document_utils import read_document
-from db_utils import SnapshotDB
+from db_utils import SnapshotDB, TABLE_COLUMNS
 
 # Initialize database
 db = SnapshotDB()
 
+# Runs the initial-response call alongside the CoT chain
+executor = ThreadPoolExecutor(max_workers=16)
+
+_THINKING_RE = re.compile(r'<thinking>(.*?)</thinking>', re.DOTALL)
+
 def process_question(file, user_prompt, system_prompt, cot_prompt, selected_model):
     try:
         # Read document content if file is provided
         document_content = None
         if file is not None:
             document_content = read_document(file.name)
+            check_document_size(selected_model, document_content)
+
+        # The initial response does not depend on the CoT chain, so run both at once
+        prefix = document_prefix(system_prompt, document_content)
+        initial_future = executor.submit(
+            get_model_response,
+            selected_model, build_initial_response_prompt(prefix, user_prompt), cached_prefix=prefix
+        )
 
-        # Get thinking, reflection, and output from cot_reflection
-        thinking, reflection, output = cot_reflection(
+        # Stream thinking, reflection, and output from cot_reflection as they arrive
+        initial_response, actual_thinking, reflection, output = "", "", "", ""
+        for thinking, reflection, output in stream_cot_reflection(
             system_prompt=system_prompt,
             cot_prompt=cot_prompt,
             question=user_prompt,
             document_content=document_content,
             model_name=selected_model
-        )
+        ):
+            if not initial_response and initial_future.done():
+                initial_response = initial_future.result()
 
-        # Extract the actual thinking content
-        thinking_match = re.search(r'<thinking>(.*?)</thinking>', thinking, re.DOTALL)
-        actual_thinking = thinking_match.group(1).strip() if thinking_match else thinking
+            # Extract the actual thinking content
+            thinking_match = _THINKING_RE.search(thinking)
+            actual_thinking = thinking_match.group(1).strip() if thinking_match else thinking
 
-        # Get the initial response
-        doc_content = f"Document Content:\n{document_content}\n\n" if document_content else ""
-        initial_response_prompt = (f"{system_prompt}\n\n{doc_content}"
-                                   f"Question: {user_prompt}\n\n"
-                                   "Provide a concise answer to this question without any explanation or reasoning.")
-        initial_response = get_model_response(selected_model, initial_response_prompt)
+            # Prompt boxes are only re-sent with the final result
+            yield user_prompt, initial_response, actual_thinking, reflection, output, gr.update(), gr.update()
 
-        return user_prompt, initial_response, actual_thinking, reflection, output, system_prompt, cot_prompt
+        yield user_prompt, initial_future.result(), actual_thinking, reflection, output, system_prompt, cot_prompt
     except Exception as e:
         print(f"Process error: {str(e)}")
-        return user_prompt, f"An error occurred: {str(e)}", "", "", "", system_prompt, cot_prompt
+        yield user_prompt, f"An error occurred: {str(e)}", "", "", "", system_prompt, cot_prompt
 
 def save_current_snapshot(snapshot_name, user_prompt, system_prompt, model_name, 
                          cot_prompt, initial_response, thinking, reflection, 
-                         final_response, tags):
+                         final_response, tags, search_term=None, current_rows=None):
     try:
+        # On failure the table is left as it is rather than reloaded or cleared
         if not snapshot_name:
-            return "Error: Please provide a snapshot name!", None
+            return "Error: Please provide a snapshot name!", gr.update()
 
         if not user_prompt:
-            return "Error: No prompt to save!", None
+            return "Error: No prompt to save!", gr.update()
 
         snapshot_data = {
             'snapshot_name': snapshot_name.strip(),
@@ -72,25 +89,35 @@ def save_current_snapshot(snapshot_name, user_prompt, system_prompt, model_name,
             'tags': tags.strip() if tags else ''
         }
 
-        save_result = db.save_snapshot(snapshot_data)
-        if "Error" in save_result or "Database error" in save_result:
-            return save_result, None
+        row = db.insert_snapshot(snapshot_data)
 
-        return "✓ Snapshot saved successfully!", update_snapshots_table()
+        # A filtered table is reloaded since the new snapshot may not match;
+        # otherwise it goes on top of the rows already shown
+        if search_term:
+            return "✓ Snapshot saved successfully!", update_snapshots_table(search_term)
+        shown_rows = [r for r in current_rows or [] if r and r[0] not in ("", None)]
+        return "✓ Snapshot saved successfully!", ([TABLE_COLUMNS(row)] + shown_rows)[:TABLE_ROW_LIMIT]
     except Exception as e:
         print(f"Save error: {str(e)}")
-        return f"Error saving snapshot: {str(e)}", None
+        return f"Error saving snapshot: {str(e)}", gr.update()
+
+# Components filled by load_snapshot_by_id ahead of its status message
+LOADED_FIELD_COUNT = 9
+
+def _load_failed(message: str) -> tuple:
+    # Leave the form as it is and only report the problem
+    return (*(gr.update() for _ in range(LOADED_FIELD_COUNT)), message)
 
 def load_snapshot_by_id(snapshot_id):
     try:
         if not snapshot_id:
-            return [None] * 9 + ["Please enter a snapshot ID to load"]
+            return _load_failed("Please enter a snapshot ID to load")
         
         # Convert snapshot_id to integer if necessary
         try:
             snapshot_id = int(snapshot_id)
         except ValueError:
-            return [None] * 9 + ["Invalid Snapshot ID. Please enter a numeric ID."]
+            return _load_failed("Invalid Snapshot ID. Please enter a numeric ID.")
         
         snapshot = db.get_snapshot_by_id(snapshot_id)
         
@@ -99,12 +126,12 @@ def load_snapshot_by_id(snapshot_id):
         print(f"Snapshot type: {type(snapshot)}")
         
         if not snapshot:
-            return [None] * 9 + ["Snapshot not found"]
+            return _load_failed("Snapshot not found")
         
         if isinstance(snapshot, tuple):
             # Ensure the tuple has at least 9 elements
             if len(snapshot) < 9:
-                return [None] * 9 + ["Snapshot data is incomplete."]
+                return _load_failed("Snapshot data is incomplete.")
             
             # Access snapshot elements using indices
             return [
@@ -120,20 +147,21 @@ def load_snapshot_by_id(snapshot_id):
                 "✓ Snapshot loaded successfully"
             ]
         else:
-            return [None] * 9 + ["Unexpected snapshot data format."]
+            return _load_failed("Unexpected snapshot data format.")
     except Exception as e:
         print(f"Load error: {str(e)}")
-        return [None] * 9 + [f"Error loading snapshot: {str(e)}"]
+        return _load_failed(f"Error loading snapshot: {str(e)}")
+
+# Newest snapshots shown in the table; searching reaches older ones
+TABLE_ROW_LIMIT = 200
 
 def update_snapshots_table(search_term=None):
     try:
-        snapshots = db.get_snapshots(search_term)
+        # Only ID, Name, Created At, Model, Prompt and Tags are read, already in table order
+        snapshots = db.get_snapshot_summaries(search_term, limit=TABLE_ROW_LIMIT)
         if isinstance(snapshots, str) and ("Error" in snapshots or "Database error" in snapshots):
             return []
-        # Return data for the table
-        # Assuming snapshots is a list of tuples and indices correspond to:
-        # 0: ID, 1: Name, 10: Created At, 4: Model, 2: Prompt, 11: Tags
-        return [[s[0], s[1], str(s[10]), s[4], s[2], s[11]] for s in snapshots]
+        return snapshots
     except Exception as e:
         print(f"Table update error: {str(e)}")
         return []
@@ -161,13 +189,9 @@ def delete_selected_snapshots(selected_data):
 
 def export_snapshots():
     try:
-        result = db.export_snapshots()
-        if isinstance(result, str) and not ("Error" in result or "Database error" in result):
-            # Save to file
-            with open('snapshots_export.json', 'w') as f:
-                f.write(result)
-            return "✓ Snapshots exported successfully to 'snapshots_export.json'"
-        return f"Export failed: {result}"
+        # Streamed from the database to the file rather than built in memory
+        db.export_snapshots_to_file('snapshots_export.json')
+        return "✓ Snapshots exported successfully to 'snapshots_export.json'"
     except Exception as e:
         print(f"Export error: {str(e)}")
         return f"Error exporting snapshots: {str(e)}"
@@ -271,7 +295,7 @@ with gr.Blocks(theme=gr.themes.Soft()) as iface:
                 headers=["ID", "Name", "Created At", "Model", "Prompt", "Tags"],
                 interactive=True,
                 label="Saved Snapshots",
-                value=update_snapshots_table(),
+                value=[],  # Filled on page load by iface.load below
                 type="array",
                 datatype=["number", "str", "str", "str", "str", "str"]
             )
@@ -304,14 +328,17 @@ with gr.Blocks(theme=gr.themes.Soft()) as iface:
         fn=save_current_snapshot,
         inputs=[snapshot_name, user_prompt_output, system_prompt, 
                 model_selector, cot_prompt, initial_response_output,
-                thinking_output, reflection_output, final_output, tags_input],
+                thinking_output, reflection_output, final_output, tags_input,
+                search_box, snapshots_table],
         outputs=[snapshot_status, snapshots_table]
     )
     
     search_box.change(
         fn=update_snapshots_table,
         inputs=[search_box],
-        outputs=snapshots_table
+        outputs=snapshots_table,
+        trigger_mode="always_last",  # Skip intermediate keystrokes while a query is running
+        show_progress="hidden"
     )
     
     refresh_btn.click(
@@ -341,6 +368,19 @@ with gr.Blocks(theme=gr.themes.Soft()) as iface:
         inputs=[],
         outputs=operation_status
     )
+    
+    # Query snapshots per page load rather than once while building the UI at
+    # import, so startup does not wait on the database and new visitors see
+    # current rows
+    iface.load(
+        fn=update_snapshots_table,
+        inputs=[search_box],
+        outputs=snapshots_table,
+        show_progress="hidden"
+    )
 
 if __name__ == "__main__":
-    iface.launch(share=False) 
\ No newline at end of file
+    # Handlers run in Gradio's worker threads and spend nearly all their time
+    # waiting on model I/O, so allow far more of them than CPU-bound work would
+    iface.queue(default_concurrency_limit=48, max_size=64, api_open=False)
+    iface.launch(share=False, max_threads=64) 
\ No newline at end of file
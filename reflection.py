@@ -4,17 +4,14 @@ warnings.filterwarnings("ignore")
 from langchain.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain.chains import LLMChain
-from docx import Document
 import argparse
 import os
+from document_utils import read_docx as _read_docx_text
 
 # Function to read docx file
 def read_docx(file_path):
-    doc = Document(file_path)
-    full_text = []
-    for para in doc.paragraphs:
-        full_text.append(para.text)
-    return '\n'.join(full_text)
+    # Streams the document XML, so python-docx is never imported
+    return _read_docx_text(file_path)
 
 # Initialize the language model
 llm = ChatOpenAI(model="gpt-4")
@@ -1,7 +1,6 @@
 import warnings
 warnings.filterwarnings("ignore")
 
-from docx import Document
 import argparse
 import logging
 from abc import ABC, abstractmethod
@@ -11,6 +10,7 @@ from google.oauth2 import service_account
 from google.api_core.exceptions import GoogleAPICallError, InvalidArgument
 from vertexai.generative_models import GenerativeModel
 import yaml
+from document_utils import read_document
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -49,6 +49,35 @@ class TextGenerationInterface(ModelInterface):
             logger.error(f"Text Generation API call error: {e}")
             return None
 
+# Gemini 1.5 Pro input limit
+CONTEXT_WINDOW_TOKENS = 1_000_000
+# Only ask the API for an exact count once the estimate is within 10% of the limit
+TOKEN_COUNT_THRESHOLD = int(CONTEXT_WINDOW_TOKENS * 0.9)
+
+def approx_tokens(text: str) -> int:
+    """Estimate the token count at ~4 characters per token, without an API call."""
+    return len(text) // 4
+
+def check_prompt_size(model, prompt: str) -> None:
+    """Raise ValueError if the prompt does not fit the context window."""
+    if approx_tokens(prompt) <= TOKEN_COUNT_THRESHOLD:
+        return
+    total_tokens = model.count_tokens(prompt).total_tokens
+    if total_tokens >= CONTEXT_WINDOW_TOKENS:
+        raise ValueError(
+            f"Prompt is too long: {total_tokens} tokens exceeds the "
+            f"{CONTEXT_WINDOW_TOKENS}-token context window"
+        )
+
+def query_gemini_pro(model, prompt: str, return_full_response: bool = False, generation_config=None):
+    check_prompt_size(model, prompt)
+    try:
+        response = model.generate_content(contents=[prompt], generation_config=generation_config)
+        return response.text
+    except (GoogleAPICallError, InvalidArgument) as e:
+        logger.error(f"Gemini API call error: {e}")
+        return None
+
 def create_model_interface(model_name: str) -> ModelInterface:
     try:
         if 'gemini' in model_name.lower():
@@ -62,8 +91,9 @@ def create_model_interface(model_name: str) -> ModelInterface:
 
 def read_docx(file_path: str) -> str:
     try:
-        doc = Document(file_path)
-        return '\n'.join(para.text for para in doc.paragraphs)
+        # Shared reader: cached by content hash, so the app's second read of
+        # the same upload does not parse it again
+        return read_document(file_path)
     except Exception as e:
         logger.error(f"Error reading document: {e}")
         raise
@@ -1,6 +1,7 @@
 import gradio as gr
 import os
 from reflection_gemini import main as reflection_main, read_docx
+from ui_utils import LOGO_PATH, logo_html
 
 # Default values
 DEFAULT_PROJECT = "genai-sandbox-421407"
@@ -33,24 +34,19 @@ def process_document(file, question, project, location, credentials):
     except Exception as e:
         return question, f"An error occurred: {str(e)}", "", "", ""
 
-# Get the absolute path to the logo file
-current_dir = os.path.dirname(os.path.abspath(__file__))
-logo_path = os.path.join(current_dir, "images", "Linklaters.svg.png")
-
 # Verify logo file exists
-if not os.path.exists(logo_path):
-    print(f"Warning: Logo file not found at {logo_path}")
+logo_found = os.path.exists(LOGO_PATH)
+if not logo_found:
+    print(f"Warning: Logo file not found at {LOGO_PATH}")
 
 # Gradio interface
 with gr.Blocks() as iface:
-    # Use Gradio's Image component for the logo
+    # Inline the logo as a data URI, encoded once per process, rather than
+    # having gr.Image serve the file from disk on every page load
     with gr.Row():
         with gr.Column():
-            gr.Image(value=logo_path, 
-                    show_label=False, 
-                    container=False, 
-                    height=70, 
-                    show_download_button=False)
+            if logo_found:
+                gr.HTML(logo_html())
     
     gr.Markdown(
         """
@@ -92,5 +88,5 @@ with gr.Blocks() as iface:
 
 if __name__ == "__main__":
     # Print the logo path for debugging
-    print(f"Looking for logo at: {logo_path}")
+    print(f"Looking for logo at: {LOGO_PATH}")
     iface.launch(share=False)
\ No newline at end of file
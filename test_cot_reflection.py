@@ -0,0 +1,47 @@
+import re
+
+import pytest
+
+pytest.importorskip("vertexai")
+
+from cot_reflection import StreamingSectionParser, extract_sections
+
+# extract_sections as originally written with regexes, kept as the reference
+_THINKING_RE = re.compile(r'<thinking>(.*?)</thinking>', re.DOTALL)
+_REFLECTION_RE = re.compile(r'<reflection>(.*?)</reflection>', re.DOTALL)
+_OUTPUT_RE = re.compile(r'<output>(.*?)(?:</output>|$)', re.DOTALL)
+_PARTIAL_THINKING_RE = re.compile(r'<thinking>(.*?)(?:</thinking>|$)', re.DOTALL)
+_PARTIAL_REFLECTION_RE = re.compile(r'<reflection>(.*?)(?:</reflection>|$)', re.DOTALL)
+
+def _regex_sections(full_response, partial=False):
+    thinking_re = _PARTIAL_THINKING_RE if partial else _THINKING_RE
+    reflection_re = _PARTIAL_REFLECTION_RE if partial else _REFLECTION_RE
+    matches = (thinking_re.search(full_response), reflection_re.search(full_response),
+               _OUTPUT_RE.search(full_response))
+    return tuple(m.group(1).strip() if m else "" for m in matches)
+
+RESPONSES = [
+    "<thinking>t</thinking><reflection>r</reflection><output>o</output>",
+    "<thinking>t</thinking><output>o</output><reflection>r</reflection>",
+    "<output>o</output><reflection>r</reflection><thinking>t</thinking>",
+    "<thinking> t\n</thinking>\n<reflection>\nr </reflection>\n<output>\no\n",
+    "<thinking>t</thinking><reflection>r",
+    "<thinking>t",
+    "<reflection>r</reflection>",
+    "no tags at all",
+    "",
+    "<thinking>a</thinking><thinking>b</thinking><output>o</output>",
+    "<thinking>mentions <output> early</thinking><output>o</output>",
+]
+
+@pytest.mark.parametrize("partial", [False, True])
+@pytest.mark.parametrize("response", RESPONSES)
+def test_extract_sections_matches_regex_behaviour(response, partial):
+    assert extract_sections(response, partial=partial) == _regex_sections(response, partial=partial)
+
+@pytest.mark.parametrize("response", RESPONSES[:4])
+def test_streaming_parser_handles_sections_in_any_order(response):
+    parser = StreamingSectionParser()
+    for char in response:
+        sections = parser.feed(char)
+    assert sections == extract_sections(response, partial=True)
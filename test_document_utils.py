@@ -0,0 +1,50 @@
+import functools
+import multiprocessing
+import zipfile
+
+import document_utils
+from document_utils import read_docx, read_document
+
+_DOCUMENT_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+  <w:body>
+    <w:p>
+      <w:pPr>
+        <w:tabs>
+          <w:tab w:val="left" w:pos="720"/>
+          <w:tab w:val="right" w:pos="9000"/>
+        </w:tabs>
+      </w:pPr>
+      <w:r><w:t>Clause 1</w:t></w:r>
+      <w:r><w:tab/><w:t>Text</w:t></w:r>
+    </w:p>
+    <w:p>
+      <w:r><w:t>Second</w:t><w:br/><w:t>line</w:t></w:r>
+    </w:p>
+  </w:body>
+</w:document>
+"""
+
+def _write_docx(path, document_xml):
+    with zipfile.ZipFile(path, "w") as docx:
+        docx.writestr("word/document.xml", document_xml)
+    return str(path)
+
+def test_read_docx_ignores_tab_stop_definitions(tmp_path):
+    path = _write_docx(tmp_path / "tabs.docx", _DOCUMENT_XML)
+
+    assert read_docx(path) == "Clause 1\tText\nSecond\nline"
+
+def test_read_document_parses_in_process_and_caches(tmp_path, monkeypatch):
+    path = _write_docx(tmp_path / "upload.docx", _DOCUMENT_XML)
+    document_utils._document_cache.clear()
+
+    assert read_document(path) == "Clause 1\tText\nSecond\nline"
+    # No worker process is started, so the launching app is never re-imported
+    assert multiprocessing.active_children() == []
+
+    @functools.wraps(read_docx)
+    def fail(file_path):
+        raise AssertionError("cached document parsed again")
+    monkeypatch.setattr(document_utils, "read_docx", fail)
+    assert read_document(path) == "Clause 1\tText\nSecond\nline"
@@ -0,0 +1,61 @@
+import base64
+import os
+import gradio as gr
+from functools import lru_cache
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images", "Linklaters.svg.png")
+
+@lru_cache(maxsize=None)
+def logo_html(height: int = 70) -> str:
+    """
+    Return the Linklaters logo as an inline <img> tag.
+
+    The PNG is read and base64-encoded once per process, so page loads
+    neither touch the file system nor make a separate request for the image.
+
+    Args:
+        height: Rendered height in pixels
+
+    Returns:
+        HTML snippet for gr.HTML
+    """
+    with open(LOGO_PATH, "rb") as f:
+        logo_b64 = base64.b64encode(f.read()).decode("ascii")
+    return f'<img src="data:image/png;base64,{logo_b64}" alt="Linklaters" style="height: {height}px;">'
+
+def build_header(title: str) -> None:
+    """
+    Render the logo and page title shared by the CoT apps.
+
+    Must be called inside a gr.Blocks context.
+
+    Args:
+        title: Heading shown under the logo
+    """
+    with gr.Column(scale=1):
+        gr.HTML(logo_html())
+
+    gr.Markdown("<br><br>")
+
+    gr.Markdown(f"""
+    <h1 style='text-align: center; margin-bottom: 0;'>{title}</h1>
+    <p style='text-align: center; font-style: italic; margin-top: 5px; font-size: 1.2em;'>powered by Linklaters GenAI Platform</p>
+    """)
+
+def build_output_row(**textbox_kwargs) -> tuple:
+    """
+    Render the row of five CoT result boxes shared by the CoT apps.
+
+    Must be called inside a gr.Blocks context.
+
+    Args:
+        **textbox_kwargs: Extra arguments passed to every gr.Textbox
+
+    Returns:
+        Tuple of (user_prompt, initial_response, thinking, reflection, final_output) textboxes
+    """
+    with gr.Row():
+        return tuple(
+            gr.Textbox(label=label, **textbox_kwargs)
+            for label in ("1. User Prompt", "2. Initial Response", "3. Thinking", "4. Reflection", "5. Final Output")
+        )